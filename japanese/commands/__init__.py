@@ -2,6 +2,7 @@ from .commands import print_ctype_counts, export_frequencies, print_nonstandard,
 from .latex import latex
 from .wiktionary_readings import all_wiktionary_readings
 from .readings_analysis import reading_analysis
+from .benchmark import kana_benchmark
 
 COMMANDS = {
     'joyo': joyo_stats,
@@ -12,4 +13,5 @@ COMMANDS = {
     "wiktionary_readings": all_wiktionary_readings,
     'reading_analysis': reading_analysis,
     'kanji_in_order': kanji_in_order,
+    'kana_benchmark': kana_benchmark,
 }
@@ -0,0 +1,45 @@
+import argparse
+import time
+from typing import Callable
+
+from shared.commands.base import command, with_arg
+from japanese.lib.exercise_list import JapaneseExerciseList
+from japanese.lib.kana import phonemic_transcribe_hiragana, transcribe_many
+
+
+def run_kana_benchmark(title: str, num_readings: int, repeat: int, func: Callable[[], None]):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+
+    print(f"{title}: {num_readings * repeat} readings in {elapsed:.2f}s ({num_readings * repeat/elapsed:.0f} readings/s)")
+
+
+def is_transcribable(kana: str) -> bool:
+    try:
+        phonemic_transcribe_hiragana(kana)
+        return True
+    except ValueError:
+        return False
+
+
+@with_arg(lambda parser: parser.add_argument('-r', '--repeat', type=int, default=5,
+                                            help='Number of times to transcribe every reading'))
+@command
+def kana_benchmark(el: JapaneseExerciseList, namespace: argparse.Namespace):
+    readings = {reading.kana for reading in el.readings.keys() if reading.kana}
+    transcribable = set(filter(is_transcribable, readings))
+    occurrences = [
+        reading.kana
+        for reading, count in el.readings.counts().items()
+        if reading.kana in transcribable
+        for _ in range(count)
+    ]
+    print(f"{len(transcribable)}/{len(readings)} distinct readings are transcribable, "
+          f"{len(occurrences)} occurrences\n")
+
+    run_kana_benchmark("Transcribe each", len(occurrences), namespace.repeat,
+                       lambda: [phonemic_transcribe_hiragana(kana) for kana in occurrences])
+    run_kana_benchmark("Transcribe many", len(occurrences), namespace.repeat,
+                       lambda: transcribe_many(occurrences))
@@ -1,9 +1,11 @@
 import argparse
 import os
 
-from shared.commands.base import command, with_words
-from japanese.lib.ctypes import CharacterType, ctype
-from japanese.lib.kanji import JOYO, joyo_up_to
+import numpy as np
+
+from shared.commands.base import command, with_arg, with_words
+from japanese.lib.ctypes import CharacterType
+from japanese.lib.kanji import JoyoLevel, joyo_index
 from japanese.lib.exercise_list import JapaneseExerciseList
 
 
@@ -21,7 +23,8 @@ def export_frequencies(el: JapaneseExerciseList, namespace: argparse.Namespace):
     os.makedirs(dirname, exist_ok=True)
     for ct in CharacterType:
         with open(os.path.join(dirname, f'{ct.value}.txt'), 'w') as fh:
-            for w, f in sorted(list(el.character_counts(namespace.words)[ct].items()), key=lambda x: x[1], reverse=True):
+            for w, f in sorted(list(el.character_counts(namespace.words)[ct].counts().items()), key=lambda x: x[1],
+                               reverse=True):
                 fh.write(f"{w}\t{f}\n")
 
 
@@ -31,13 +34,13 @@ NORMAL_CTYPES = (CharacterType.KANJI, CharacterType.HIRAGANA, CharacterType.KATA
 @with_words
 @command
 def print_nonstandard(el: JapaneseExerciseList, namespace: argparse.Namespace):
-    for e in el.exercises:
-        s = e.string(namespace.words)
-        nonstandard = [c for c in s if ctype(c) not in NORMAL_CTYPES]
-        if nonstandard:
-            print(s)
-            print(','.join(nonstandard))
-            print()
+    corpus = el.codepoints(namespace.words)
+    nonstandard = ~corpus.mask(*NORMAL_CTYPES)
+
+    for i, characters in corpus.selected(nonstandard):
+        print(el.exercises[i].string(namespace.words))
+        print(','.join(characters))
+        print()
 
 
 def percent_string(numerator: int, denominator: int) -> str:
@@ -47,60 +50,57 @@ def percent_string(numerator: int, denominator: int) -> str:
 @with_words
 @command
 def joyo_stats(el: JapaneseExerciseList, namespace: argparse.Namespace):
-    kanji_counts = {
-        k: len(exercises)
-        for k, exercises in el.character_counts(namespace.words)[CharacterType.KANJI].items()
-    }
+    kanji_counts = el.character_counts(namespace.words)[CharacterType.KANJI].counts()
     print(f"{len(kanji_counts)} kanji\n")
 
-    for level, kanji_list in JOYO.items():
-        cumulayive_joyo = joyo_up_to(level)
-        cumulative_included_joyo = [j for j in cumulayive_joyo if j in kanji_counts]
-        cumulative_well_tested_joyo = [j for j in cumulayive_joyo if (kanji_counts.get(j, 0) >= namespace.threshold)]
+    joyo = joyo_index()
+    tested = joyo.mask(kanji_counts)
+    well_tested = joyo.mask(j for j, count in kanji_counts.items() if count >= namespace.threshold)
 
-        print(f"{percent_string(len(cumulative_well_tested_joyo), len(cumulayive_joyo))} "
+    for level, level_joyo in joyo.level_masks.items():
+        cumulative_joyo = joyo.cumulative_masks[level]
+        cumulative_size = np.count_nonzero(cumulative_joyo)
+
+        print(f"{percent_string(np.count_nonzero(cumulative_joyo & well_tested), cumulative_size)} "
               f"Joyo up to level {level} are well-tested")
-        print(f"{percent_string(len(cumulative_included_joyo), len(cumulayive_joyo))} "
+        print(f"{percent_string(np.count_nonzero(cumulative_joyo & tested), cumulative_size)} "
               f"Joyo up to level {level} are tested")
 
-        level_included_joyo = [j for j in kanji_list if j in kanji_counts]
-        level_well_tested_joyo = sorted([j for j in kanji_list if kanji_counts.get(j, 0) >= namespace.threshold])
-        level_poorly_tested_joyo = sorted(list(set(level_included_joyo) - set(level_well_tested_joyo)))
-        level_excluded_joyo = sorted([j for j in kanji_list if j not in kanji_counts])
-
-        if len(level_well_tested_joyo) > 0:
-            print(f"{percent_string(len(level_well_tested_joyo), len(kanji_list))} "
-                  f"well tested joyo: {''.join(level_well_tested_joyo)}")
-        if len(level_poorly_tested_joyo) > 0:
-            print(f"{percent_string(len(level_poorly_tested_joyo), len(kanji_list))} "
-                  f"poorly tested joyo: {''.join(level_poorly_tested_joyo)}")
-        if len(level_excluded_joyo) > 0:
-            print(f"{percent_string(len(level_excluded_joyo), len(kanji_list))} "
-                  f"excluded Joyo: {''.join(level_excluded_joyo)}")
+        level_size = np.count_nonzero(level_joyo)
+        for title, selected in (("well tested joyo", level_joyo & well_tested),
+                                ("poorly tested joyo", level_joyo & tested & ~well_tested),
+                                ("excluded Joyo", level_joyo & ~tested)):
+            if selected.any():
+                print(f"{percent_string(np.count_nonzero(selected), level_size)} {title}: {joyo.select(selected)}")
 
         print()
 
-    all_joyo = joyo_up_to(7)
-    non_joyo_kanji = [j for j in kanji_counts if j not in all_joyo]
+    non_joyo_kanji = [j for j in kanji_counts if j not in joyo]
     non_joyo_well_tested_kanji = [
         j
         for j, count in kanji_counts.items()
-        if (j not in all_joyo) and (count >= namespace.threshold)
+        if (j not in joyo) and (count >= namespace.threshold)
     ]
     print(f"{len(non_joyo_kanji)} non-joyo kanji: {''.join(non_joyo_kanji)}")
     print(f"{len(non_joyo_well_tested_kanji)} well-tested non-joyo kanji: {''.join(non_joyo_well_tested_kanji)}")
 
 
+def parse_joyo_level(level: str) -> JoyoLevel:
+    parsed = int(level) if level.isdigit() else level
+    if parsed not in joyo_index().level_masks:
+        raise argparse.ArgumentTypeError(
+            f"unknown Joyo level {level!r}, choose from {', '.join(map(str, joyo_index().level_masks))}")
+    return parsed
+
+
+@with_arg(lambda parser: parser.add_argument('-j', '--joyo_level', type=parse_joyo_level, required=False,
+                                            default=None, help='Leave out Joyo kanji up to this level'))
 @command
-def kanji_in_order(el: JapaneseExerciseList, _namespace: argparse.Namespace):
-    kanji_list = []
-    kanji_set = set()
-
-    for e in el.exercises:
-        for c in e.sentence:
-            if ctype(c) is CharacterType.KANJI and c not in kanji_set:
-                kanji_list.append(c)
-                kanji_set.add(c)
+def kanji_in_order(el: JapaneseExerciseList, namespace: argparse.Namespace):
+    kanji_list = el.codepoints(False).in_order(CharacterType.KANJI)
+    if namespace.joyo_level is not None:
+        known = joyo_index().up_to(namespace.joyo_level)
+        kanji_list = [c for c in kanji_list if c not in known]
 
     for i, c in enumerate(kanji_list):
         print(c, end='')
@@ -37,19 +37,19 @@ def latex_escape(s: str, cjk_permitted: bool):
 @command
 def latex(el: JapaneseExerciseList, namespace: argparse.Namespace):
     most_common_kanji = sorted(
-        el.character_counts(namespace.words)[CharacterType.KANJI].items(),
-        key=lambda x: len(x[1]),
+        el.character_counts(namespace.words)[CharacterType.KANJI].counts().items(),
+        key=lambda x: x[1],
         reverse=True,
     )
 
     content = ""
 
-    for character, all_exercises in most_common_kanji:
+    for character, count in most_common_kanji:
         content += (
             f"\\begin{{CJK}}{{UTF8}}{{{CJK_FONT}}}"
             f"\\section{{{character}}}"
             "\\end{CJK}\n\n"
-            f"{len(all_exercises)} occurrences\n\n"
+            f"{count} occurrences\n\n"
             "\\bigskip\n\n"
         )
 
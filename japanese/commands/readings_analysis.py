@@ -1,33 +1,79 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from typing import Optional
 
-from shared.commands.base import command
+from shared.commands.base import command, with_arg, with_limit
 from japanese.lib.exercise_list import JapaneseExerciseList
 
 Readings = dict[str, dict[str, int]]
+# For each kanji, the spellings its readings can take, grouped by length
+SpellingIndex = dict[str, dict[int, set[str]]]
 
+SOKUON_ENDINGS = "つちくき"
+RENDAKU = str.maketrans("かきくけこさしすせそたちつてとはひふへほ", "がぎぐげござじずぜぞだぢづでどばびぶべぼ")
+HANDAKUTEN = str.maketrans("はひふへほ", "ぱぴぷぺぽ")
 
-def is_regular_reading(kanji: str, multi_kanji_reading: str, one_kanji_readings: Readings):
-    if (kanji == "") is not (multi_kanji_reading == ""):
-        print(f"Empty mismatch: {repr(kanji)} {repr(multi_kanji_reading)}")
-        return False
 
-    if kanji == "":
-        return True
+def sokuon_variants(reading: str) -> list[str]:
+    if len(reading) > 1 and reading[-1] in SOKUON_ENDINGS:
+        return [reading, reading[:-1] + 'っ']
+    return [reading]
 
+
+def rendaku_variants(reading: str) -> list[str]:
+    return list(dict.fromkeys([reading, reading[0].translate(RENDAKU) + reading[1:],
+                               reading[0].translate(HANDAKUTEN) + reading[1:]]))
+
+
+def add_spelling(index: SpellingIndex, kanji: str, spelling: str):
+    index.setdefault(kanji, {}).setdefault(len(spelling), set()).add(spelling)
+
+
+def expand_iteration_marks(kanji: str) -> str:
+    out = ''
     for logogram in kanji:
-        for one_kanji_reading in one_kanji_readings.get(logogram, {}).keys():
-            if multi_kanji_reading.startswith(one_kanji_reading):
-                if is_regular_reading(kanji[1:], multi_kanji_reading[len(one_kanji_reading):], one_kanji_readings):
-                    return True
+        out += out[-1] if logogram == '々' and out else logogram
+    return out
+
+
+class ReadingSegmenter:
+    def __init__(self, one_kanji_readings: Readings):
+        # Rendaku only voices a kanji which doesn't start the compound
+        self.initial: SpellingIndex = {}
+        self.medial: SpellingIndex = {}
+
+        for kanji, readings in one_kanji_readings.items():
+            for reading in readings:
+                for spelling in sokuon_variants(reading):
+                    add_spelling(self.initial, kanji, spelling)
+                    for voiced in rendaku_variants(spelling):
+                        add_spelling(self.medial, kanji, voiced)
+
+    def segment(self, kanji: str, kana: str) -> Optional[list[str]]:
+        kanji = expand_iteration_marks(kanji)
 
-            if len(one_kanji_reading) > 1 and one_kanji_reading[-1] in "つちくき":
-                with_sokuon = one_kanji_reading[:-1] + 'っ'
-                if with_sokuon not in one_kanji_readings[logogram] and multi_kanji_reading.startswith(with_sokuon):
-                    if is_regular_reading(kanji[1:], multi_kanji_reading[len(with_sokuon):], one_kanji_readings):
-                        one_kanji_readings[logogram][with_sokuon] = 0
-                        return True
+        # For each kanji, the kana positions reachable after it mapped to how they were first reached
+        reached: list[dict[int, tuple[int, str]]] = [{0: (0, '')}]
+        for i, logogram in enumerate(kanji):
+            spellings = (self.medial if i else self.initial).get(logogram, {})
+            reached.append({})
 
-    return False
+            for start in reached[i]:
+                for length, options in spellings.items():
+                    spelling = kana[start:start + length]
+                    if spelling in options and start + length not in reached[i + 1]:
+                        reached[i + 1][start + length] = (start, spelling)
+
+        if len(kana) not in reached[-1]:
+            return None
+
+        out, end = [], len(kana)
+        for i in range(len(kanji), 0, -1):
+            end, spelling = reached[i][end]
+            out.append(spelling)
+
+        return out[::-1]
 
 
 def add_reading(readings: Readings, kanji: str, reading: str, count: int):
@@ -43,32 +89,52 @@ def add_reading(readings: Readings, kanji: str, reading: str, count: int):
 @dataclass
 class ReadingsAnalysis:
     el: JapaneseExerciseList
+    processes: Optional[int] = None
 
     def __post_init__(self):
         self.one_kanji_readings: Readings = {}
-        multi_kanji_readings: Readings = {}
+        multi_kanji_readings: list[tuple[str, str, int]] = []
 
-        for (kanji, reading), exercises in self.el.readings.items():
-            if len(kanji) == 1:
-                add_reading(self.one_kanji_readings, kanji, reading, len(exercises))
+        for reading, count in self.el.readings.counts().items():
+            if not reading.kana:
+                continue
+            elif len(reading.kanji) == 1:
+                add_reading(self.one_kanji_readings, reading.kanji, reading.kana, count)
             else:
-                add_reading(multi_kanji_readings, kanji, reading, len(exercises))
+                multi_kanji_readings.append((reading.kanji, reading.kana, count))
 
         self.regular_multi_kanji_readings: Readings = {}
         self.irregular_multi_kanji_readings: Readings = {}
 
-        for kanji, readings in multi_kanji_readings.items():
-            for reading, count in readings.items():
-                if is_regular_reading(kanji, reading, self.one_kanji_readings):
-                    add_reading(self.regular_multi_kanji_readings, kanji, reading, count)
-                else:
-                    add_reading(self.irregular_multi_kanji_readings, kanji, reading, count)
+        segments = self.segment_all([kanji for kanji, _, _ in multi_kanji_readings],
+                                    [reading for _, reading, _ in multi_kanji_readings])
+
+        for (kanji, reading, count), spellings in zip(multi_kanji_readings, segments):
+            if spellings is None:
+                add_reading(self.irregular_multi_kanji_readings, kanji, reading, count)
+                continue
+
+            add_reading(self.regular_multi_kanji_readings, kanji, reading, count)
+            for logogram, spelling in zip(expand_iteration_marks(kanji), spellings):
+                self.one_kanji_readings[logogram].setdefault(spelling, 0)
+
+    def segment_all(self, kanji: list[str], kana: list[str]) -> list[Optional[list[str]]]:
+        segmenter = ReadingSegmenter(self.one_kanji_readings)
+
+        if self.processes is None or self.processes <= 1:
+            return list(map(segmenter.segment, kanji, kana))
+
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            chunksize = max(1, len(kanji) // (self.processes * 4))
+            return list(pool.map(segmenter.segment, kanji, kana, chunksize=chunksize))
 
 
+@with_limit
+@with_arg(lambda parser: parser.add_argument('--processes', type=int, required=False, default=None,
+                                            help='Number of processes to classify readings across'))
 @command
-def reading_analysis(el: JapaneseExerciseList, limit: str = '100'):
-    analysis = ReadingsAnalysis(el)
-    limit = int(limit)
+def reading_analysis(el: JapaneseExerciseList, namespace: argparse.Namespace):
+    analysis = ReadingsAnalysis(el, namespace.processes)
 
     for name, multi_kanji_readings in (("Regular", analysis.regular_multi_kanji_readings),
                                        ("Irregular", analysis.irregular_multi_kanji_readings)):
@@ -80,7 +146,7 @@ def reading_analysis(el: JapaneseExerciseList, limit: str = '100'):
             for reading, count in readings.items()
         ]
         multi_kanji_readings.sort(key=lambda x: x[2])
-        list_limit = min(limit, len(multi_kanji_readings))
+        list_limit = min(namespace.limit, len(multi_kanji_readings))
 
         for i, (kanji, reading, count) in enumerate(multi_kanji_readings[-list_limit:]):
             print(f"{list_limit-i:>4} {kanji:＿<4} {reading:＿<6} {count:>4}")
@@ -2,10 +2,12 @@ import argparse
 import os
 from tqdm import tqdm
 
-from shared.commands.base import command
-from japanese.lib.ctypes import CharacterType, ctype
-from japanese.lib.kana import parse_onset, phonemic_transcribe_hiragana
-from japanese.lib.kanji import joyo_up_to, wiktionary_readings
+from shared.commands.base import command, with_arg
+from shared.lib.client import HttpClient
+from japanese.lib.ctypes import CharacterType
+from japanese.lib.kana import parse_onset, transcribe_many
+from japanese.lib.kanji import WiktionaryReadings, joyo_index, wiktionary_readings
+from japanese.lib.wiktionary_crawler import crawl_wiktionary_readings
 from japanese.lib.exercise_list import JapaneseExerciseList
 
 
@@ -36,10 +38,10 @@ ONSET_RESPELLINGS = {
 def make_readings_csv(title: str, readings: list[str], separator=','):
     pairs = {}
 
-    for reading in readings:
-        onset, final = parse_onset(phonemic_transcribe_hiragana(reading))
+    for reading, transcription in zip(readings, transcribe_many(readings)):
+        onset, final = parse_onset(transcription)
         if onset not in CSV_ONSETS or final not in CSV_FINALS:
-            print(reading, phonemic_transcribe_hiragana(reading))
+            print(reading, transcription)
         else:
             pairs[(onset, final)] = pairs.get((onset, final), 0) + 1
 
@@ -57,17 +59,22 @@ def make_readings_csv(title: str, readings: list[str], separator=','):
         fh.write(content)
 
 
+@with_arg(lambda parser: parser.add_argument('-j', '--jobs', type=int, default=8,
+                                            help='Number of concurrent Wiktionary requests'))
+@with_arg(lambda parser: parser.add_argument('-d', '--delay', type=float, default=0.5,
+                                            help='Seconds each request slot waits between requests'))
+@with_arg(lambda parser: parser.add_argument('-b', '--batch_size', type=int, default=100,
+                                            help='Number of characters to crawl between cache writes'))
 @command
-def all_wiktionary_readings(el: JapaneseExerciseList, _namespace: argparse.Namespace):
-    kanji = set()
+def all_wiktionary_readings(el: JapaneseExerciseList, namespace: argparse.Namespace):
+    kanji = set(el.codepoints(False).in_order(CharacterType.KANJI)) | joyo_index().up_to(7)
 
-    for e in el.exercises:
-        for c in e.sentence:
-            if ctype(c) is CharacterType.KANJI:
-                kanji.add(c)
-
-    for c in joyo_up_to(7):
-        kanji.add(c)
+    crawl_wiktionary_readings(
+        sorted(c for c in kanji if c not in WiktionaryReadings),
+        concurrency=namespace.jobs,
+        delay=namespace.delay,
+        batch_size=namespace.batch_size,
+    )
 
     readings_by_type = {}
     for c in tqdm(sorted(list(kanji))):
@@ -89,3 +96,5 @@ def all_wiktionary_readings(el: JapaneseExerciseList, _namespace: argparse.Names
             make_readings_csv(rt, readings)
 
         print()
+
+    print(HttpClient.report())
@@ -0,0 +1,73 @@
+from functools import cache, cached_property
+from typing import Sequence
+
+import numpy as np
+
+from shared.lib.postings import PostingIndex, build_postings
+from .ctypes import CharacterType, ctype
+
+CTYPES = tuple(CharacterType)
+CTYPE_CODES = {ct: i for i, ct in enumerate(CTYPES)}
+# Every character type is assigned below U+FFFF, so astral codepoints share the code of U+FFFF
+CTYPE_TABLE_SIZE = 0x10000
+
+
+@cache
+def ctype_table() -> np.ndarray:
+    return np.array([CTYPE_CODES[ctype(chr(o))] for o in range(CTYPE_TABLE_SIZE)], dtype=np.uint8)
+
+
+def encode_codepoints(strings: Sequence[str]) -> np.ndarray:
+    return np.frombuffer("".join(strings).encode("utf-32-le", "surrogatepass"), dtype="<u4")
+
+
+def decode_codepoints(codepoints: np.ndarray) -> list[str]:
+    return list(map(chr, codepoints.tolist()))
+
+
+class CodepointCorpus:
+    def __init__(self, strings: Sequence[str]):
+        self.size = len(strings)
+        self.codepoints = encode_codepoints(strings)
+        self.lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        self.offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        np.cumsum(self.lengths, out=self.offsets[1:])
+
+    @cached_property
+    def ordinals(self) -> np.ndarray:
+        return np.repeat(np.arange(self.size, dtype=np.uint32), self.lengths)
+
+    @cached_property
+    def types(self) -> np.ndarray:
+        return ctype_table()[np.minimum(self.codepoints, CTYPE_TABLE_SIZE - 1)]
+
+    def mask(self, *cts: CharacterType) -> np.ndarray:
+        return np.isin(self.types, [CTYPE_CODES[ct] for ct in cts])
+
+    def type_counts(self) -> dict[CharacterType, int]:
+        return dict(zip(CTYPES, np.bincount(self.types, minlength=len(CTYPES)).tolist()))
+
+    def in_order(self, ct: CharacterType) -> list[str]:
+        codepoints, first = np.unique(self.codepoints[self.types == CTYPE_CODES[ct]], return_index=True)
+        return decode_codepoints(codepoints[np.argsort(first)])
+
+    def postings(self, ct: CharacterType, exercises: Sequence) -> PostingIndex:
+        selected = self.types == CTYPE_CODES[ct]
+        codepoints, first, inverse = np.unique(self.codepoints[selected], return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        ranks = np.empty(len(order), dtype=np.uint32)
+        ranks[order] = np.arange(len(order), dtype=np.uint32)
+
+        return build_postings(exercises, decode_codepoints(codepoints[order]), ranks[inverse.reshape(-1)],
+                              self.ordinals[selected], np.flatnonzero(selected).astype(np.uint32))
+
+    def selected(self, mask: np.ndarray) -> list[tuple[int, list[str]]]:
+        characters = decode_codepoints(self.codepoints[mask])
+        counts = np.bincount(self.ordinals[mask], minlength=self.size)
+        flagged = np.flatnonzero(counts)
+        ends = np.cumsum(counts[flagged]).tolist()
+
+        return [
+            (i, characters[start:end])
+            for i, start, end in zip(flagged.tolist(), [0, *ends], ends)
+        ]
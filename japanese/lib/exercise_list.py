@@ -1,54 +1,48 @@
 from functools import cached_property, cache
 from typing import Union
 
-from shared.lib.dataclasses import Exercise, ExerciseList
-from japanese.lib.ctypes import CharacterType, ctype
-from japanese.lib.kanji import Reading, ReadingsParser
+from shared.lib.dataclasses import CollectionKey, ExerciseList, ItemExtractor
+from shared.lib.postings import PostingIndex, Postings
+from japanese.lib.codepoints import CodepointCorpus
+from japanese.lib.ctypes import CharacterType
+from japanese.lib.kanji import Reading, parse_readings
 
 Collectible = Union[str, Reading]
-Occurrences = dict[Collectible, list[Exercise]]
 
 
 class JapaneseExerciseList(ExerciseList):
     @cache
-    def character_counts(self, words: bool) -> dict[CharacterType, Occurrences]:
-        out: dict[CharacterType, Occurrences] = {
-            ct: {}
-            for ct in CharacterType
-        }
-
-        for e in self.exercises:
-            s = e.string(words)
-            for c in s:
-                ct = ctype(c)
-                if c not in out[ct]:
-                    out[ct][c] = []
-                out[ct][c].append(s)
-
-        return out
+    def codepoints(self, words: bool) -> CodepointCorpus:
+        return CodepointCorpus([e.string(words) for e in self.exercises])
 
     @cache
-    def ctype_counts(self, words: bool) -> dict[CharacterType, int]:
+    def character_counts(self, words: bool) -> dict[CharacterType, PostingIndex]:
         return {
-            ct: sum(len(exercises) for exercises in self.character_counts(words)[ct].values())
+            ct: self.codepoints(words).postings(ct, self.exercises)
             for ct in CharacterType
         }
 
-    @cached_property
-    def readings(self) -> Occurrences:
-        out: dict[Reading, list[Exercise]] = {}
+    @cache
+    def ctype_counts(self, words: bool) -> dict[CharacterType, int]:
+        return self.codepoints(words).type_counts()
 
-        for e in self.exercises:
-            for reading in ReadingsParser(e).parse():
-                if reading not in out:
-                    out[reading] = []
-                out[reading].append(e)
+    def collection_key(self, collection_type: str, words: bool, case: bool) -> CollectionKey:
+        if collection_type == "READINGS":
+            return collection_type, False, False
+        return super().collection_key(collection_type, words, case)
 
+    def get_item_extractors(self, words: bool, case: bool) -> dict[str, ItemExtractor]:
+        out = super().get_item_extractors(words, case)
+        out["READINGS"] = lambda e: parse_readings(e.pronunciation)
         return out
 
+    @property
+    def readings(self) -> PostingIndex:
+        return self.collection("READINGS", False, False)
+
     @cached_property
-    def readings_by_character(self) -> dict[str, list[tuple[Reading, list[Exercise]]]]:
-        out: dict[str, list[tuple[Reading, list[Exercise]]]] = {}
+    def readings_by_character(self) -> dict[str, list[tuple[Reading, Postings]]]:
+        out: dict[str, list[tuple[Reading, Postings]]] = {}
 
         for reading, exercises in self.readings.items():
             for c in reading.kanji:
@@ -63,7 +57,6 @@ class JapaneseExerciseList(ExerciseList):
 
     def get_collection_getters(self, words: bool, case: bool):
         out = super().get_collection_getters(words, case)
-        out["READINGS"] = lambda: self.readings
         for ct in CharacterType:
             out[ct.name] = (lambda _ct: lambda: self.character_counts(words)[_ct])(ct)
         return out
@@ -1,6 +1,5 @@
 import re
-
-import regex
+from typing import Iterable
 
 from .ctypes import CharacterType
 
@@ -67,27 +66,59 @@ KATAKANA_TRANSCRIPTIONS: dict[str, str] = replace_table({
 })
 
 
+def phonemic_hiragana_units() -> dict[str, str]:
+    # Every kana sequence whose transcription depends on its neighbours is a unit of its own: small ゃゅょ with the
+    # kana they palatalize, ん before a vowel, and っ with the consonant it doubles
+    moras = {k: v for k, v in PHONEMIC_HIRAGANA_TRANSCRIPTIONS.items() if v[0] != '-' and v != 'Q'}
+    for kana, t in list(moras.items()):
+        if t.endswith('i'):
+            for small, y in zip(HIRAGANA_TABLE['-y'], VOWELS):
+                if small != ' ':
+                    moras[kana + small] = t[:-1] + 'y' + y
+
+    units = dict(moras)
+    for kana, t in moras.items():
+        if PHONEMIC_HIRAGANA_TRANSCRIPTIONS[kana[0]][0] in VOWELS:
+            units['ん' + kana] = 'N\'' + t
+        if t[0] in 'ksctp':
+            units['っ' + kana] = t[0] + t
+    units['っ'] = 'Q'
+
+    return units
+
+
+PHONEMIC_HIRAGANA_UNITS: dict[str, str] = phonemic_hiragana_units()
+
+# Longest units first, and a lone っ only at the end of a word
+PHONEMIC_HIRAGANA_PATTERN = re.compile('|'.join([
+    *sorted((re.escape(k) for k in PHONEMIC_HIRAGANA_UNITS if k != 'っ'), key=len, reverse=True),
+    'っ$',
+]))
+
+
+# Transcribes kana one by one, leaving uppercase, '-' or non-ASCII wherever neighbours or unknown characters matter
+PHONEMIC_HIRAGANA_TABLE = str.maketrans({
+    **{chr(o): '\ufffd' for o in range(0x80)},
+    **PHONEMIC_HIRAGANA_TRANSCRIPTIONS,
+})
+
+
 def phonemic_transcribe_hiragana(s: str) -> str:
-    out = ''
-    for c in s:
-        t = PHONEMIC_HIRAGANA_TRANSCRIPTIONS[c]
-        prev = out[-1] if out else None
-        if t[0] == '-':
-            if t[1] == 'y':
-                assert prev == 'i'
-                out = out[:-1] + t[1:]
-            else:
-                raise ValueError(f"Unknown continuation character: {s}")
-        else:
-            if t[0] in 'aiueo' and prev == 'N':
-                out += '\''
-            elif out and prev == 'Q':
-                assert t[0] in 'ksctp'
-                out = out[:-1] + t[0]
+    transcription = s.translate(PHONEMIC_HIRAGANA_TABLE)
+    if transcription.isascii() and transcription.islower() and '-' not in transcription:
+        return transcription
 
-            out += t
+    units = PHONEMIC_HIRAGANA_PATTERN.findall(s)
+    if sum(map(len, units)) != len(s):
+        raise ValueError(f"Untranscribable hiragana: {s}")
 
-    return out
+    return ''.join(map(PHONEMIC_HIRAGANA_UNITS.__getitem__, units))
+
+
+def transcribe_many(strings: Iterable[str]) -> list[str]:
+    strings = list(strings)
+    transcriptions = {s: phonemic_transcribe_hiragana(s) for s in dict.fromkeys(strings)}
+    return [transcriptions[s] for s in strings]
 
 
 def parse_onset(transription: str) -> tuple[str, str]:
@@ -132,26 +163,41 @@ LONG_VOWELS = {
 }
 
 
+def romaji_syllables() -> dict[str, str]:
+    syllables = {
+        romaji: kana
+        for romaji, kana in ROMAJI_MORAS_TO_HIRAGANA.items()
+        if ROMAJI_SYLLABLE_PATTERN.fullmatch(romaji)
+    }
+
+    for mora, kana in list(syllables.items()):
+        for coda in 'nkstp':
+            syllables.setdefault(coda + mora, romaji_coda_to_hiragana(coda) + kana)
+
+    long_vowels = {v: lv for lv, v in LONG_VOWELS.items()}
+    for syllable, kana in list(syllables.items()):
+        syllables[syllable[:-1] + long_vowels[syllable[-1]]] = kana + ROMAJI_MORAS_TO_HIRAGANA[syllable[-1]]
+
+    for coda in 'nkstp':
+        syllables[coda] = romaji_coda_to_hiragana(coda)
+
+    return syllables
+
+
+ROMAJI_SYLLABLE_PATTERN = re.compile("[kgsztdcjnhfpbmyrw]*[aeiou]")
+ROMAJI_SYLLABLES: dict[str, str] = romaji_syllables()
+ROMAJI_PATTERN = re.compile("[kgsztdcjnhfpbmyrw]*[aeiouāēīōū]|(?<=[aeiouāēīōū])[nkstp]$")
+
+
 def romaji_to_hiragana(romaji: str) -> str:
-    match = regex.fullmatch("(([kgsztdcjnhfpbmyrw]*)[aeiouāēīōū])+([nkstp]?)", romaji)
-    if not match:
+    syllables = ROMAJI_PATTERN.findall(romaji)
+    if not syllables or sum(map(len, syllables)) != len(romaji):
         raise ValueError(f"Malformatted romaji: {romaji}")
 
-    out = ''
-    for syllable in match.captures(1):
-        if syllable[-1] in LONG_VOWELS:
-            short_vowel = LONG_VOWELS[syllable[-1]]
-            out += romaji_to_hiragana(syllable[:-1] + short_vowel) + ROMAJI_MORAS_TO_HIRAGANA[short_vowel]
-        elif syllable in ROMAJI_MORAS_TO_HIRAGANA:
-            out += ROMAJI_MORAS_TO_HIRAGANA[syllable]
-        elif syllable[1:] in ROMAJI_MORAS_TO_HIRAGANA:
-            out += romaji_coda_to_hiragana(syllable[0]) + ROMAJI_MORAS_TO_HIRAGANA[syllable[1:]]
-        else:
-            raise ValueError(f"Malformatted syllable: {syllable}")
-    if match.group(3):
-        out += romaji_coda_to_hiragana(match.group(3))
-
-    return out
+    try:
+        return ''.join(map(ROMAJI_SYLLABLES.__getitem__, syllables))
+    except KeyError as e:
+        raise ValueError(f"Malformatted syllable: {e.args[0]}")
 
 
 TRANSCRIPTIONS: dict[CharacterType, dict[str, str]] = {
@@ -165,10 +211,19 @@ ZU_CHARS = 'ずづ'
 JI_CHARS = 'じぢ'
 
 
+# Characters match_conforming can swap for one another, each mapped to one representative
+CONFORMING_CHARS = str.maketrans('うづぢ', 'おずじ')
+
+
 def match_conforming(prefix: str, word: str) -> tuple[str, bool]:
     if len(prefix) > len(word):
         return prefix, False
 
+    if word.startswith(prefix):
+        return prefix, True
+    if prefix.translate(CONFORMING_CHARS) != word[:len(prefix)].translate(CONFORMING_CHARS):
+        return prefix, False
+
     conformed_prefix = ''
     for pc, wc in zip(prefix, word):
         if pc == wc:
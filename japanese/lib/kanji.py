@@ -1,19 +1,21 @@
-from dataclasses import dataclass
+import atexit
+from functools import cache
 import json
 import os
-from typing import Iterable, Optional
+import re
+from typing import Iterable, Optional, Union
 
 from bs4 import BeautifulSoup as bs
-import requests
+import numpy as np
 
-from shared.lib.networking import get_wiktionary_section
-from shared.lib.dataclasses import Exercise
+from shared.lib.client import HttpClient
+from shared.lib.networking import fetch_wiktionary_page, parse_wiktionary_section
 from .ctypes import CharacterType, ctype
 from .kana import romaji_to_hiragana, match_conforming
 
 
 def load_wikipedia_joyo():
-    res = requests.get("https://en.wikipedia.org/wiki/List_of_j%C5%8Dy%C5%8D_kanji")
+    res = HttpClient.get("https://en.wikipedia.org/wiki/List_of_j%C5%8Dy%C5%8D_kanji")
     soup = bs(res.text, features="html.parser")
     table = soup.find("table", {"class": "sortable wikitable"})
     rows = table.tbody.find_all("tr")[1:]
@@ -106,86 +108,145 @@ JOYO = {
 }
 
 
-def joyo_up_to(max_level=6) -> set[str]:
-    out = set()
+JoyoLevel = Union[int, str]
 
-    for level in JOYO.keys():
-        overlap = set(JOYO[level]) & out
-        if len(overlap) > 0:
-            raise ValueError(f"Overlapping sets for level {level}: {', '.join(overlap)}")
 
-        out.update(JOYO[level])
+class JoyoIndex:
+    def __init__(self, levels: dict[JoyoLevel, str]):
+        self.levels: dict[str, JoyoLevel] = {}
+        for level, kanji in levels.items():
+            overlap = set(kanji) & self.levels.keys()
+            if len(overlap) > 0:
+                raise ValueError(f"Overlapping sets for level {level}: {', '.join(overlap)}")
 
-        if level == max_level:
-            return out
+            self.levels.update(dict.fromkeys(kanji, level))
+
+        # Ordinals follow codepoint order, so kanji picked out by a mask come out sorted
+        self.kanji = np.array(sorted(self.levels), dtype="<U1")
+        self.ordinals = {c: i for i, c in enumerate(self.kanji.tolist())}
+
+        level_of = np.array([self.levels[c] for c in self.kanji.tolist()], dtype=object)
+        self.level_masks = {level: level_of == level for level in levels}
+        self.cumulative_masks = dict(zip(levels, np.logical_or.accumulate(list(self.level_masks.values()))))
+
+    def __contains__(self, c: str):
+        return c in self.levels
+
+    def mask(self, chars: Iterable[str]) -> np.ndarray:
+        out = np.zeros(len(self.kanji), dtype=bool)
+        out[[self.ordinals[c] for c in chars if c in self.ordinals]] = True
+        return out
+
+    def select(self, mask: np.ndarray) -> str:
+        return ''.join(self.kanji[mask].tolist())
+
+    def up_to(self, max_level: JoyoLevel = 6) -> set[str]:
+        return set(self.kanji[self.cumulative_masks[max_level]].tolist())
+
+
+@cache
+def joyo_index() -> JoyoIndex:
+    return JoyoIndex(JOYO)
+
+
+READING_KANJI_PATTERN = re.compile("[\u4e00-\u9fff々]*")
+READING_KANA_PATTERN = re.compile("[\u3040-\u309fー]*")
+# A run of kanji, which can't start with 々, and the bracketed kana reading following it if there is one
+READING_PATTERN = re.compile("([\u4e00-\u9fff][\u4e00-\u9fff々]*)(【[^】]*】)?")
 
 
-@dataclass
 class Reading:
-    kanji: str
-    kana: Optional[str]
+    __slots__ = ("kanji", "kana", "_hash")
+
+    def __init__(self, kanji: str, kana: Optional[str]):
+        assert READING_KANJI_PATTERN.fullmatch(kanji)
+        if kana:
+            assert READING_KANA_PATTERN.fullmatch(kana)
 
-    def __post_init__(self):
-        assert all((ctype(c) is CharacterType.KANJI or c == '々') for c in self.kanji)
-        if self.kana:
-            assert all((ctype(c) is CharacterType.HIRAGANA or c == 'ー') for c in self.kana)
+        self.kanji: str = kanji
+        self.kana: Optional[str] = kana
+        self._hash: int = hash((kanji, kana))
 
     def __str__(self):
         ideographic_space = '\u3000'
         return f"{self.kanji.ljust(2, ideographic_space)}【{self.kana}】"
 
+    def __repr__(self):
+        return f"Reading(kanji={self.kanji!r}, kana={self.kana!r})"
+
     def __len__(self):
         return len(str(self))
 
+    def __eq__(self, other):
+        if not isinstance(other, Reading):
+            return NotImplemented
+        return self is other or (self.kanji == other.kanji and self.kana == other.kana)
+
     def __hash__(self):
-        return str(self).__hash__()
+        return self._hash
+
+    def __reduce__(self):
+        # Hashes of strings differ between processes, so unpickling goes back through the constructor
+        return reading, (self.kanji, self.kana)
 
 
-class ReadingsParser:
-    def __init__(self, e: Exercise):
-        self.pronunciation = e.pronunciation
-        self.i = None
+@cache
+def reading(kanji: str, kana: Optional[str]) -> Reading:
+    return Reading(kanji, kana)
 
-    def next(self):
-        if self.i < len(self.pronunciation):
-            return self.pronunciation[self.i]
-        return None
 
-    def parse(self) -> Iterable[Reading]:
-        self.i = 0
-        while self.i < len(self.pronunciation):
-            if ctype(self.next()) is CharacterType.KANJI:
-                yield self.grab_reading()
+def parse_readings(pronunciation: str) -> list[Reading]:
+    return [
+        reading(kanji, bracketed[1:-1] if bracketed else None)
+        for kanji, bracketed in READING_PATTERN.findall(pronunciation)
+    ]
+
+
+WIKTIONARY_READINGS_FILE = "wiktionary_readings.json"
+
+WIKTIONARY_FLUSH_EVERY = 100
+
+
+class _WiktionaryReadingsStore:
+    def __init__(self):
+        self._readings: Optional[dict[str, dict[str, list[str]]]] = None
+        self.unsaved: int = 0
+        atexit.register(self.flush)
+
+    @property
+    def readings(self) -> dict[str, dict[str, list[str]]]:
+        if self._readings is None:
+            if os.path.isfile(WIKTIONARY_READINGS_FILE):
+                with open(WIKTIONARY_READINGS_FILE, "r") as fh:
+                    self._readings = json.load(fh)
             else:
-                self.i += 1
+                self._readings = {}
 
-    def grab_reading(self) -> Reading:
-        assert ctype(self.next()) is CharacterType.KANJI
+        return self._readings
 
-        kanji, kana = '', ''
+    def __contains__(self, c: str) -> bool:
+        return c in self.readings
 
-        while ctype(self.next()) is CharacterType.KANJI or self.next() == '々':
-            kanji += self.next()
-            self.i += 1
+    def __getitem__(self, c: str) -> dict[str, list[str]]:
+        return self.readings[c]
 
-        if self.next() != '【':
-            return Reading(kanji, None)
-        self.i += 1
+    def add(self, c: str, readings: dict[str, list[str]]):
+        self.readings[c] = readings
+        self.unsaved += 1
 
-        while self.next() != '】':
-            kana += self.next()
-            self.i += 1
-        self.i += 1
+    def flush(self):
+        if self.unsaved == 0:
+            return
 
-        return Reading(kanji, kana)
+        tmp_file = WIKTIONARY_READINGS_FILE + ".tmp"
+        with open(tmp_file, "w") as fh:
+            json.dump(self.readings, fh, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_file, WIKTIONARY_READINGS_FILE)
 
+        self.unsaved = 0
 
-WIKTIONARY_READINGS_FILE = "wiktionary_readings.json"
 
-WiktionaryReadings: dict[str, dict[str, list[str]]] = {}
-if os.path.isfile(WIKTIONARY_READINGS_FILE):
-    with open(WIKTIONARY_READINGS_FILE, "r") as fh:
-        WiktionaryReadings = json.load(fh)
+WiktionaryReadings = _WiktionaryReadingsStore()
 
 
 def wiktionary_readings(c: str) -> dict[str, list[str]]:
@@ -194,7 +255,16 @@ def wiktionary_readings(c: str) -> dict[str, list[str]]:
     if c in WiktionaryReadings:
         return WiktionaryReadings[c]
 
-    section = get_wiktionary_section(c, "Japanese")
+    out = parse_wiktionary_readings(c, fetch_wiktionary_page(c))
+    WiktionaryReadings.add(c, out)
+    if WiktionaryReadings.unsaved >= WIKTIONARY_FLUSH_EVERY:
+        WiktionaryReadings.flush()
+
+    return out
+
+
+def parse_wiktionary_readings(c: str, html: str) -> dict[str, list[str]]:
+    section = parse_wiktionary_section(html, "Japanese")
     out = {}
     in_readings = False
     for e in section:
@@ -246,8 +316,4 @@ def wiktionary_readings(c: str) -> dict[str, list[str]]:
 
             break
 
-    WiktionaryReadings[c] = out
-    with open(WIKTIONARY_READINGS_FILE, "w") as fh:
-        json.dump(WiktionaryReadings, fh, indent=2, sort_keys=True, ensure_ascii=False)
-
     return out
@@ -0,0 +1,47 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from tqdm import tqdm
+
+from shared.lib.networking import fetch_wiktionary_page
+from .kanji import WiktionaryReadings, parse_wiktionary_readings
+
+
+async def _crawl(chars: list[str], concurrency: int, delay: float, batch_size: int, processes: Optional[int]) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    with ProcessPoolExecutor(max_workers=processes) as parse_pool:
+        async def crawl_one(c: str) -> tuple[str, Optional[dict[str, list[str]]]]:
+            try:
+                async with semaphore:
+                    html = await asyncio.to_thread(fetch_wiktionary_page, c)
+                    await asyncio.sleep(delay)
+
+                return c, await loop.run_in_executor(parse_pool, parse_wiktionary_readings, c, html)
+            except Exception as e:
+                print(f"Failed crawling Wiktionary page for {c}: {e}")
+                return c, None
+
+        crawled = 0
+
+        try:
+            for next_result in tqdm(asyncio.as_completed([crawl_one(c) for c in chars]), total=len(chars)):
+                c, readings = await next_result
+                if readings is None:
+                    continue
+
+                WiktionaryReadings.add(c, readings)
+                crawled += 1
+                if WiktionaryReadings.unsaved >= batch_size:
+                    WiktionaryReadings.flush()
+        finally:
+            WiktionaryReadings.flush()
+
+    return crawled
+
+
+def crawl_wiktionary_readings(chars: Iterable[str], concurrency: int = 8, delay: float = 0.5,
+                              batch_size: int = 100, processes: Optional[int] = None) -> int:
+    return asyncio.run(_crawl(list(chars), concurrency, delay, batch_size, processes))
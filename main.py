@@ -1,4 +1,5 @@
 import argparse
+import os
 import sys
 
 from shared.lib.dataclasses import all_exercises
@@ -34,7 +35,7 @@ if __name__ == "__main__":
     command = dispatch_table[command_name]
 
     command(
-        all_exercises(f"{language_code}-eng"),
+        all_exercises(f"{language_code}-eng", columnar=os.getenv("EXERCISE_STORE") == "columnar"),
         argparse.ArgumentParser(),
         sys.argv[3:],
     )
@@ -1,5 +1,6 @@
 from .commands import (
     reload_sentences,
+    prefetch_tokens,
     containing,
     played_pattern,
     print_most_common,
@@ -10,9 +11,11 @@ from .commands import (
 )
 from .survey import survey
 from .zipf import zipf
+from .benchmark import benchmark, fake_server
 
 COMMANDS = {
     'reload': reload_sentences,
+    'prefetch_tokens': prefetch_tokens,
     'common': print_most_common,
     'survey': survey,
     'contain': containing,
@@ -22,4 +25,6 @@ COMMANDS = {
     "zipf": zipf,
     "new": new_items,
     'sample': sample_sentences,
+    'benchmark': benchmark,
+    'fake_server': fake_server,
 }
@@ -30,23 +30,31 @@ def command(func: Callable[[ExerciseList, argparse.Namespace], None]):
                             help="Well-tested threshold")
 
         namespace = parser.parse_args(unparsed_args)
+        el = exercise_list_class(exercises)
 
         if namespace.playing:
             if namespace.num_sentences:
                 print("Don't pass both --playing and --num_sentences")
 
-            exercises = [
-                e for e in exercises
-                if e.numPlayed > 0
-            ]
+            el = el.subset([
+                e.numPlayed > 0
+                for e in exercises
+            ])
         elif namespace.num_sentences:
-            exercises = exercises[29:namespace.num_sentences+29]
+            el = el.subset(range(len(exercises))[29:namespace.num_sentences+29])
 
-        func(exercise_list_class(exercises), namespace)
+        func(el, namespace)
 
     return wrapped_func
 
 
+def positive_int(value: str) -> int:
+    parsed = int(value)
+    if parsed < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return parsed
+
+
 def with_arg(adder: Callable[[argparse.ArgumentParser], None]):
     def command_wrapper(func: Callable[[list[Exercise], argparse.ArgumentParser, list[str]], None]):
         def wrapped_func(exercises: list[Exercise], parser: argparse.ArgumentParser, unparsed_args: list[str]):
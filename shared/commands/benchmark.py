@@ -0,0 +1,99 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import Callable
+
+from shared.lib import networking
+from shared.lib.dataclasses import ExerciseList
+from shared.lib.fake_server import FakeClozemaster, synthetic_exercise
+from .base import command, with_arg, get_language_code
+
+with_fake_server_args = [
+    with_arg(lambda parser: parser.add_argument('--recorded', action='store_true',
+                                                help='Serve the cached sentences instead of synthetic ones')),
+    with_arg(lambda parser: parser.add_argument('--pages', type=int, default=40,
+                                                help='Number of synthetic pages')),
+    with_arg(lambda parser: parser.add_argument('--per_page', type=int, default=50)),
+    with_arg(lambda parser: parser.add_argument('--latency', type=float, default=0.05,
+                                                help='Seconds the server waits before each response')),
+    with_arg(lambda parser: parser.add_argument('--rate_limit', type=float, default=0.0,
+                                                help='Probability of answering 429')),
+]
+
+
+def with_fake_server(func):
+    for adder in with_fake_server_args:
+        func = adder(func)
+    return func
+
+
+def make_fake_server(el: ExerciseList, namespace: argparse.Namespace) -> FakeClozemaster:
+    if namespace.recorded:
+        exercises = [e.record() for e in el.exercises]
+    else:
+        exercises = [synthetic_exercise(i) for i in range(namespace.pages * namespace.per_page)]
+
+    return FakeClozemaster(
+        exercises,
+        per_page=namespace.per_page,
+        latency=namespace.latency,
+        rate_limit_probability=namespace.rate_limit,
+    ).start()
+
+
+def run_benchmark(title: str, fake: FakeClozemaster, func: Callable[[], None]):
+    before = fake.statuses.copy()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    statuses = fake.statuses - before
+    num_requests = sum(statuses.values())
+
+    print(f"{title}: {num_requests} requests in {elapsed:.2f}s ({num_requests/elapsed:.1f} requests/s), "
+          f"{statuses[429]} rate limited, {num_requests - statuses[200] - statuses[429]} other errors")
+
+
+@with_fake_server
+@command
+def fake_server(el: ExerciseList, namespace: argparse.Namespace):
+    fake = make_fake_server(el, namespace)
+    print(f"Serving {len(fake.exercises)} sentences, run commands with CLOZEMASTER_URL={fake.url}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+@with_fake_server
+@with_arg(lambda parser: parser.add_argument('--tokens', type=int, default=500,
+                                            help='Number of token requests'))
+@with_arg(lambda parser: parser.add_argument('-j', '--jobs', type=int, default=8))
+@with_arg(lambda parser: parser.add_argument('-r', '--retries', type=int, default=3))
+@with_arg(lambda parser: parser.add_argument('-R', '--rate', type=float, default=100.0,
+                                            help='Maximum token requests per second'))
+@command
+def benchmark(el: ExerciseList, namespace: argparse.Namespace):
+    fake = make_fake_server(el, namespace)
+    networking.CLOZEMASTER_URL = fake.url
+    if networking.SESSION_ID is None:
+        networking.SESSION_ID = "benchmark"
+
+    course = f"{get_language_code()}-eng"
+    tokens_urls = [e["tokensUrl"] for e in fake.exercises[:namespace.tokens]]
+
+    def download():
+        exercises = networking.get_all_exercises(course, jobs=namespace.jobs, retries=namespace.retries)
+        assert len(exercises) == len(fake.exercises)
+
+    def fetch_all_tokens():
+        limiter = networking.RateLimiter(namespace.rate, namespace.jobs)
+        with ThreadPoolExecutor(max_workers=namespace.jobs) as executor:
+            list(executor.map(lambda url: networking.fetch_tokens(url, limiter), tokens_urls))
+
+    try:
+        run_benchmark("Download", fake, download)
+        run_benchmark("Tokens", fake, fetch_all_tokens)
+    finally:
+        fake.stop()
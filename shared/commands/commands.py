@@ -1,16 +1,62 @@
 import argparse
-import math
 import random
 
-from shared.lib.dataclasses import all_exercises, Exercise, ExerciseList
-from shared.commands.base import (
-    get_language_code, command, with_substring, with_words, with_limit, with_collection_type, with_case, with_arg)
-
+import numpy as np
 
+from shared.lib.client import HttpClient
+from shared.lib.dataclasses import all_exercises, update_exercises, Exercise, ExerciseList, TokenManager
+from shared.lib.index_cache import clear_index_cache
+from shared.lib.ngrams import ngram_candidates
+from shared.lib.postings import PostingIndex
+from shared.lib.search import SearchIndex
+from shared.commands.base import (
+    get_language_code, command, positive_int, with_substring, with_words, with_limit, with_collection_type, with_case,
+    with_arg)
+
+
+@with_arg(lambda parser: parser.add_argument('-j', '--jobs', type=int, default=8,
+                                            help='Number of pages to download concurrently'))
+@with_arg(lambda parser: parser.add_argument('-r', '--retries', type=int, default=3,
+                                            help='Number of times to retry a failed page'))
+@with_arg(lambda parser: parser.add_argument('--restart', action='store_true',
+                                            help='Discard pages left over from an interrupted reload'))
+@with_arg(lambda parser: parser.add_argument('--build_indices', action='store_true',
+                                            help='Build every collection index after reloading (fetches missing tokens)'))
+@with_arg(lambda parser: parser.add_argument('-i', '--incremental', action='store_true',
+                                            help='Only fetch pages until they match the cached sentences'))
 @command
-def reload_sentences(_el: ExerciseList, _namespace: argparse.ArgumentParser):
-    exercises = all_exercises(f'{get_language_code()}-eng', force_reload=True)
-    print(f"{len(exercises)} sentences downloaded.")
+def reload_sentences(el: ExerciseList, namespace: argparse.Namespace):
+    course = f'{get_language_code()}-eng'
+
+    if namespace.incremental:
+        update = update_exercises(course, jobs=namespace.jobs, retries=namespace.retries)
+        exercises = update.exercises
+        print(f"{update.pages_fetched} pages fetched, {update.added} sentences added, {update.updated} updated.")
+        if len(update.exercises) != update.total:
+            print(f"{len(update.exercises)} sentences cached but {update.total} available, consider a full reload.")
+    else:
+        exercises = all_exercises(course, force_reload=True, jobs=namespace.jobs, retries=namespace.retries,
+                                  restart=namespace.restart)
+        print(f"{len(exercises)} sentences downloaded.")
+
+    print(HttpClient.report())
+
+    clear_index_cache()
+    if namespace.build_indices:
+        type(el)(exercises).build_indices()
+
+
+@with_arg(lambda parser: parser.add_argument('-j', '--jobs', type=int, default=4,
+                                            help='Number of concurrent token requests'))
+@with_arg(lambda parser: parser.add_argument('-R', '--rate', type=float, default=2.0,
+                                            help='Maximum token requests per second'))
+@with_arg(lambda parser: parser.add_argument('-b', '--burst', type=int, default=4,
+                                            help='Maximum burst of token requests'))
+@command
+def prefetch_tokens(el: ExerciseList, namespace: argparse.Namespace):
+    fetched = TokenManager.prefetch(el.exercises, jobs=namespace.jobs, rate=namespace.rate, burst=namespace.burst)
+    print(f"Tokens fetched for {fetched} sentences.")
+    print(HttpClient.report())
 
 
 def contains(e: Exercise, q: str, words: bool, case: bool):
@@ -23,26 +69,76 @@ def contains(e: Exercise, q: str, words: bool, case: bool):
     return (q in string) or (q in translation)
 
 
+def scan_matches(el: ExerciseList, namespace: argparse.Namespace) -> tuple[list[tuple[int, Exercise]], int]:
+    matching = [
+        (i+1, e)
+        for i, e in enumerate(el.exercises)
+        if contains(e, namespace.substring, namespace.words, namespace.case)
+    ]
+
+    return matching[:namespace.limit], len(matching)
+
+
+def fts_matches(el: ExerciseList, namespace: argparse.Namespace) -> tuple[list[tuple[int, Exercise]], int]:
+    index = SearchIndex(f'{get_language_code()}-eng')
+    index.sync()
+
+    if len(el.exercises) == len(index):
+        ordinals, count = index.search(namespace.substring, namespace.words, namespace.case, namespace.limit)
+        return [(i+1, el.exercises[i]) for i in ordinals], count
+
+    positions = {e.id: i for i, e in enumerate(el.exercises)}
+    matching = [
+        positions[exercise_id]
+        for exercise_id in index.search_ids(namespace.substring, namespace.words, namespace.case)
+        if exercise_id in positions
+    ]
+
+    return [(i+1, el.exercises[i]) for i in matching[:namespace.limit]], len(matching)
+
+
+def ngram_matches(el: ExerciseList, namespace: argparse.Namespace) -> tuple[list[tuple[int, Exercise]], int]:
+    q = namespace.substring if namespace.case else namespace.substring.lower()
+    candidates, exact = ngram_candidates(el.contain_index(namespace.words, namespace.case), q)
+
+    if exact:
+        return [(i+1, el.exercises[i]) for i in candidates[:namespace.limit].tolist()], len(candidates)
+
+    matching = [
+        (i+1, el.exercises[i])
+        for i in candidates.tolist()
+        if contains(el.exercises[i], namespace.substring, namespace.words, namespace.case)
+    ]
+
+    return matching[:namespace.limit], len(matching)
+
+
+CONTAIN_BACKENDS = {
+    "scan": scan_matches,
+    "fts": fts_matches,
+    "ngram": ngram_matches,
+}
+
+
 @with_case
 @with_substring
 @with_words
 @with_limit
+@with_arg(lambda parser: parser.add_argument('-B', '--backend', choices=CONTAIN_BACKENDS, default='scan',
+                                            help='Scan every exercise, query the SQLite full-text index or '
+                                                 'the in-memory n-gram index'))
 @command
 def containing(el: ExerciseList, namespace: argparse.Namespace):
-    matching = [
-        (i+1, e)
-        for i, e in enumerate(el.exercises)
-        if contains(e, namespace.substring, namespace.words, namespace.case)
-    ]
+    matching, count = CONTAIN_BACKENDS[namespace.backend](el, namespace)
 
-    for i, e in matching[:namespace.limit]:
+    for i, e in matching:
         print(f"#{i+1} {e.text}")
         print(e.pronunciation)
         print(e.tokens)
         print(e.translation)
         print()
 
-    print(f"{len(matching)} exercises matched.")
+    print(f"{count} exercises matched.")
 
 
 @command
@@ -70,20 +166,20 @@ def played_pattern(el: ExerciseList, _namespace: argparse.Namespace):
 @command
 def print_most_common(el: ExerciseList, namespace: argparse.Namespace):
     occurrences = sorted(
-        el.get_counts(namespace.collection_type, namespace.words, namespace.case).items(),
-        key=lambda x: len(x[1]),
+        el.get_counts(namespace.collection_type, namespace.words, namespace.case).counts().items(),
+        key=lambda x: x[1],
     )
     limit = min(int(namespace.limit), len(occurrences))
 
-    for i, (collectible, exercises) in enumerate(occurrences[-limit:]):
-        print(f"{limit - i:>4} {len(exercises):>4} {collectible}")
+    for i, (collectible, count) in enumerate(occurrences[-limit:]):
+        print(f"{limit - i:>4} {count:>4} {collectible}")
 
     print(f"{len(occurrences)} total {namespace.collection_type} ({len(occurrences)/len(el.exercises):.2f} per exercise)")
 
     well_tested = [
-        (o, exercises)
-        for o, exercises in occurrences
-        if len(exercises) >= namespace.threshold
+        (o, count)
+        for o, count in occurrences
+        if count >= namespace.threshold
     ]
     print(f"{len(well_tested)} well-tested {namespace.collection_type} ({len(well_tested)/len(el.exercises):.2f}"
           f" per exercise)")
@@ -98,50 +194,71 @@ def histogram_bar(count: int, cap: int = 100):
 @with_collection_type
 @command
 def to_play_histogram(el: ExerciseList, namespace: argparse.Namespace):
-    played_exercises = type(el)([e for e in el.exercises if e.numPlayed > 0])
+    played_exercises = el.subset([e.numPlayed > 0 for e in el.exercises])
     current_counts = played_exercises.get_counts(namespace.collection_type, namespace.words, namespace.case)
 
     total_counts = el.get_counts(namespace.collection_type, namespace.words, namespace.case)
 
     played_total_counts = sorted(
-        [(k, total_counts[k]) for k in current_counts.keys()],
-        key=lambda x: len(x[1]),
+        [(k, total_counts.count(k)) for k in current_counts.keys()],
+        key=lambda x: x[1],
     )
 
     pad = max(map(len, current_counts.keys()))
 
-    for k, exercises in played_total_counts:
-        print(f"{k.ljust(pad, '＿')} {histogram_bar(len(exercises))}")
+    for k, count in played_total_counts:
+        print(f"{k.ljust(pad, '＿')} {histogram_bar(count)}")
 
-    print(f"{len([k for k, es in current_counts.items() if len(es) >= namespace.threshold])}"
+    print(f"{len([k for k, count in current_counts.counts().items() if count >= namespace.threshold])}"
           f"/{len(current_counts)} currently well-tested")
-    print(f"{len([k for k in current_counts.keys() if len(total_counts[k]) >= namespace.threshold])}"
+    print(f"{len([k for k in current_counts.keys() if total_counts.count(k) >= namespace.threshold])}"
           f"/{len(current_counts)} eventually well-tested")
 
 
+def coverage_curve(occurrences: PostingIndex, totals: np.ndarray, threshold: int) -> np.ndarray:
+    # Element k is the number of corpus usages of items reaching the threshold within the first k exercises
+    covered = np.bincount(occurrences.threshold_ordinals(threshold), weights=totals,
+                          minlength=len(occurrences.exercises) + 1).astype(np.int64)
+    curve = np.zeros(len(occurrences.exercises) + 1, dtype=np.int64)
+    np.cumsum(covered[:-1], out=curve[1:])
+    return curve
+
+
 @with_case
 @with_words
 @with_collection_type
+@with_arg(lambda parser: parser.add_argument('-s', '--step', type=positive_int, required=False, default=None,
+                                            help='Show coverage after every this many exercises'))
+@with_arg(lambda parser: parser.add_argument('-e', '--export', type=str, required=False, default=None,
+                                            help='Write coverage after every exercise to this file'))
 @command
 def coverage(el: ExerciseList, namespace: argparse.Namespace):
-    all_el = type(el)(all_exercises("jpn-eng"))
+    all_el = el if el.corpus is None else el.corpus
 
     occurrences = el.get_counts(collection_type=namespace.collection_type, words=namespace.words, case=namespace.case)
     all_occurrences = all_el.get_counts(collection_type=namespace.collection_type, words=namespace.words,
                                         case=namespace.case)
 
-    seen_items = set(occurrences.keys())
-    well_tested_items = set(item for item, exercises in occurrences.items() if len(exercises) >= namespace.threshold)
-
-    for title, item_set in (('tested', seen_items), ('well-tested', well_tested_items)):
-        total_occurrences = 0
-        occurrence_coverage = 0
-
-        for item, exercises in all_occurrences.items():
-            total_occurrences += len(exercises)
-            if item in item_set:
-                occurrence_coverage += len(exercises)
-
+    total_occurrences = all_occurrences.total()
+    totals = np.array([all_occurrences.count(item) for item in occurrences], dtype=np.int64)
+    curves = {
+        'tested': coverage_curve(occurrences, totals, 1),
+        'well-tested': coverage_curve(occurrences, totals, namespace.threshold),
+    }
+
+    if namespace.step is not None:
+        for n in [*range(namespace.step, len(el.exercises), namespace.step), len(el.exercises)]:
+            print(f"{n:<6} " + " ".join(f"{100*curve[n]/total_occurrences:>5.1f}% {title}"
+                                        for title, curve in curves.items()))
+
+    if namespace.export is not None:
+        with open(namespace.export, 'w') as fh:
+            fh.write("exercises\t" + "\t".join(curves.keys()) + "\n")
+            for n, row in enumerate(zip(*(curve.tolist() for curve in curves.values()))):
+                fh.write(f"{n}\t" + "\t".join(f"{c/total_occurrences:.4f}" for c in row) + "\n")
+
+    for title, curve in curves.items():
+        occurrence_coverage = int(curve[-1])
         print(f"{occurrence_coverage}/{total_occurrences} ({100*occurrence_coverage/total_occurrences:<.1f}%)"
               f" {namespace.collection_type} usages are among {title} items.")
 
@@ -150,22 +267,35 @@ def coverage(el: ExerciseList, namespace: argparse.Namespace):
 @with_words
 @with_collection_type
 @with_arg(lambda parser: parser.add_argument('-b', '--bin_size', type=int, required=False, default=60))
+@with_arg(lambda parser: parser.add_argument('--cumulative', action='store_true',
+                                            help='Also show the number of distinct items seen so far'))
 @command
 def new_items(el: ExerciseList, namespace: argparse.Namespace):
-    seen_items = set()
-    el.exercises = el.exercises[29:]
-    for i in range(math.ceil(len(el.exercises)/namespace.bin_size)):
-        day_exercises = type(el)(el.exercises[i*namespace.bin_size:(i+1)*namespace.bin_size])
-        day_items = day_exercises.get_counts(collection_type=namespace.collection_type,
-                                             words=namespace.words, case=namespace.case).keys()
-
-        new_items = [e for e in day_items if e not in seen_items]
-        if all(len(item) == 1 for item in day_items):
+    el = el.subset(range(len(el.exercises))[29:])
+    occurrences = el.get_counts(collection_type=namespace.collection_type, words=namespace.words, case=namespace.case)
+
+    items = list(occurrences)
+    bins = occurrences.first_ordinals // namespace.bin_size
+    new_counts = occurrences.new_item_counts(namespace.bin_size)
+    new_ends = np.cumsum(new_counts).tolist()
+    new_by_bin = [items[i] for i in np.argsort(bins, kind="stable").tolist()]
+
+    multi_character_items = np.array([len(item) != 1 for item in items], dtype=bool)
+    multi_character_bins = np.zeros(len(new_counts), dtype=bool)
+    multi_character_bins[occurrences.ordinals[np.repeat(multi_character_items, occurrences.occurrences)]
+                         // namespace.bin_size] = True
+
+    for i, (start, end) in enumerate(zip([0, *new_ends], new_ends)):
+        new_items = new_by_bin[start:end]
+        if not multi_character_bins[i]:
             graphic = ''.join(new_items)
         else:
             graphic = histogram_bar(len(new_items))
-        print(f"{i+1:<3} {len(new_items):<3} {graphic}")
-        seen_items = seen_items | set(day_items)
+
+        if namespace.cumulative:
+            print(f"{i+1:<3} {len(new_items):<3} {end:<6} {graphic}")
+        else:
+            print(f"{i+1:<3} {len(new_items):<3} {graphic}")
 
 
 @with_arg(lambda parser: parser.add_argument('-r', '--range', type=int, nargs='+', default=None))
@@ -39,7 +39,7 @@ def run_survey(chars: list[str], sample):
 def survey(el: ExerciseList, namespace: argparse.Namespace):
     most_common = [
         c for c, count in sorted(
-            el.get_counts(namespace.collection_type, words=namespace.words, case=namespace.case).items(),
+            el.get_counts(namespace.collection_type, words=namespace.words, case=namespace.case).counts().items(),
             key=lambda x: x[1],
             reverse=True,
         )
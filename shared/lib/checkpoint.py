@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import textwrap
+from typing import Iterable, Iterator
+
+from .networking import PageResponse
+
+
+def write_json_atomic(path: str, content):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(content, fh)
+    os.replace(tmp_path, path)
+
+
+def write_records(path: str, records: Iterable[dict]):
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w") as fh:
+        fh.write('{\n  "exercises": [')
+        for i, record in enumerate(records):
+            fh.write(",\n" if i else "\n")
+            fh.write(textwrap.indent(json.dumps(record, indent=2), "    "))
+        fh.write('\n  ]\n}')
+
+    os.replace(tmp_path, path)
+
+
+class PageCheckpoint:
+    def __init__(self, course: str):
+        self.dirname = f"exercises/{course}.pages"
+        self.meta_file = os.path.join(self.dirname, "meta.json")
+
+    def page_file(self, page: int) -> str:
+        return os.path.join(self.dirname, f"{page}.json")
+
+    def start(self, first_page: PageResponse, restart: bool = False):
+        meta = {"per_page": first_page.per_page, "total": first_page.total}
+
+        if os.path.isfile(self.meta_file) and not restart:
+            with open(self.meta_file, "r") as fh:
+                if json.load(fh) == meta:
+                    return
+
+        self.clear()
+        os.makedirs(self.dirname)
+        write_json_atomic(self.meta_file, meta)
+
+    def has(self, page: int) -> bool:
+        return os.path.isfile(self.page_file(page))
+
+    def save(self, page: int, res: PageResponse):
+        write_json_atomic(self.page_file(page), res.exercises)
+
+    def records(self, num_pages: int) -> Iterator[dict]:
+        for page in range(1, num_pages + 1):
+            with open(self.page_file(page), "r") as fh:
+                yield from json.load(fh)
+
+    def clear(self):
+        shutil.rmtree(self.dirname, ignore_errors=True)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+HTTP_CACHE_DIR = "http_cache"
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+# Seconds to wait for a connection and then between bytes of the response, so a stalled request frees its worker
+HTTP_TIMEOUT = (10, 60)
+
+
+class _HttpClient:
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR, pool_size: int = 32,
+                 timeout: tuple[float, float] = HTTP_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.sessions: dict[str, requests.Session] = {}
+        self.lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def session(self, url: str) -> requests.Session:
+        host = urlparse(url).netloc
+
+        with self.lock:
+            if host not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+
+            return self.sessions[host]
+
+    def cache_path(self, url: str, headers: dict) -> str:
+        key = hashlib.sha256(f"{url}\n{headers.get('Cookie', '')}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def load_cached(self, path: str) -> Optional[tuple[dict, bytes]]:
+        try:
+            with open(path + ".json", "r") as fh:
+                meta = json.load(fh)
+            with open(path + ".body", "rb") as fh:
+                return meta, fh.read()
+        except (OSError, ValueError):
+            return None
+
+    def store_cached(self, path: str, res: requests.Response):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            "url": res.url,
+            "encoding": res.encoding,
+            "headers": {h: res.headers[h] for h in CACHED_HEADERS if h in res.headers},
+        }
+
+        for suffix, mode, content in ((".body", "wb", res.content), (".json", "w", json.dumps(meta))):
+            tmp_path = f"{path}{suffix}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as fh:
+                fh.write(content)
+            os.replace(tmp_path, path + suffix)
+
+    def get(self, url: str, headers: Optional[dict] = None, cache: bool = True) -> requests.Response:
+        headers = dict(headers or {})
+        path = self.cache_path(url, headers)
+        cached = self.load_cached(path) if cache else None
+
+        if cached is not None:
+            meta, _ = cached
+            if "ETag" in meta["headers"]:
+                headers["If-None-Match"] = meta["headers"]["ETag"]
+            if "Last-Modified" in meta["headers"]:
+                headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+        res = self.session(url).get(url, headers=headers, timeout=self.timeout)
+
+        if res.status_code == 304 and cached is not None:
+            meta, body = cached
+            res = requests.Response()
+            res.status_code = 200
+            res.url = meta["url"]
+            res.encoding = meta["encoding"]
+            res.headers = CaseInsensitiveDict(meta["headers"])
+            res._content = body
+            with self.lock:
+                self.hits += 1
+            return res
+
+        with self.lock:
+            self.misses += 1
+
+        if cache and res.status_code == 200 and ("ETag" in res.headers or "Last-Modified" in res.headers):
+            self.store_cached(path, res)
+
+        return res
+
+    def report(self) -> str:
+        return f"{self.hits} HTTP cache hits, {self.misses} misses."
+
+
+HttpClient = _HttpClient()
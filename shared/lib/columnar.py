@@ -0,0 +1,151 @@
+from array import array
+import json
+import mmap
+import os
+import struct
+from typing import Any, Optional
+
+from .snapshot import source_signature
+
+COLUMNAR_MAGIC = b"CMCOLS1\n"
+COLUMNAR_VERSION = 1
+
+
+def columnar_filename(filename: str) -> str:
+    return filename + ".columns"
+
+
+def encode_strings(values: list[Optional[str]]) -> dict[str, bytes]:
+    encoded = [(v or "").encode() for v in values]
+    offsets = array("Q", [0])
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+
+    return {
+        "offsets": offsets.tobytes(),
+        "data": b"".join(encoded),
+        "nulls": bytes(v is None for v in values),
+    }
+
+
+def encode_column(values: list) -> tuple[str, dict[str, bytes]]:
+    if all(type(v) is int for v in values):
+        return "int", {"data": array("q", values).tobytes()}
+
+    if all(type(v) is bool for v in values):
+        return "bool", {"data": bytes(values)}
+
+    if all(v is None or type(v) is str for v in values):
+        return "str", encode_strings(values)
+
+    return "json", encode_strings([json.dumps(v, ensure_ascii=False) for v in values])
+
+
+def write_columns(filename: str, fields: tuple[str, ...], rows: list[tuple]):
+    columns = {}
+    blocks = []
+    position = 0
+
+    for f, values in zip(fields, zip(*rows) if rows else [()] * len(fields)):
+        kind, column_blocks = encode_column(list(values))
+        columns[f] = {"kind": kind, "blocks": {}}
+
+        for name, b in column_blocks.items():
+            columns[f]["blocks"][name] = (position, len(b))
+            padding = -len(b) % 8
+            blocks.append(b + b"\0" * padding)
+            position += len(b) + padding
+
+    header = json.dumps({
+        "version": COLUMNAR_VERSION,
+        "signature": source_signature(filename),
+        "fields": fields,
+        "length": len(rows),
+        "columns": columns,
+    }).encode()
+    header += b" " * (-(len(COLUMNAR_MAGIC) + 8 + len(header)) % 8)
+
+    path = columnar_filename(filename)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(COLUMNAR_MAGIC)
+        fh.write(struct.pack("<Q", len(header)))
+        fh.write(header)
+        for b in blocks:
+            fh.write(b)
+
+    os.replace(tmp_path, path)
+
+
+class ColumnStore:
+    def __init__(self, path: str, header: dict, buffer: memoryview):
+        self.path = path
+        self.fields: tuple[str, ...] = tuple(header["fields"])
+        self.length: int = header["length"]
+        self.kinds: dict[str, str] = {}
+        self.data: dict[str, memoryview] = {}
+        self.offsets: dict[str, memoryview] = {}
+        self.nulls: dict[str, memoryview] = {}
+
+        for f, column in header["columns"].items():
+            self.kinds[f] = column["kind"]
+            blocks = {
+                name: buffer[start:start + length]
+                for name, (start, length) in column["blocks"].items()
+            }
+
+            self.data[f] = blocks["data"].cast("q") if column["kind"] == "int" else blocks["data"]
+            if "offsets" in blocks:
+                self.offsets[f] = blocks["offsets"].cast("Q")
+                self.nulls[f] = blocks["nulls"]
+
+    @staticmethod
+    def open(filename: str, fields: tuple[str, ...]) -> Optional["ColumnStore"]:
+        path = columnar_filename(filename)
+
+        try:
+            with open(path, "rb") as fh:
+                mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        buffer = memoryview(mapped)
+        if bytes(buffer[:len(COLUMNAR_MAGIC)]) != COLUMNAR_MAGIC:
+            return None
+
+        start = len(COLUMNAR_MAGIC) + 8
+        try:
+            header_length, = struct.unpack("<Q", buffer[len(COLUMNAR_MAGIC):start])
+            header = json.loads(bytes(buffer[start:start + header_length]))
+            blocks_end = max((
+                position + length
+                for column in header["columns"].values()
+                for position, length in column["blocks"].values()
+            ), default=0)
+
+            if (header["version"] != COLUMNAR_VERSION or tuple(header["signature"]) != source_signature(filename)
+                    or tuple(header["fields"]) != fields or start + header_length + blocks_end > len(buffer)):
+                return None
+        except (struct.error, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+        return ColumnStore(path, header, buffer[start + header_length:])
+
+    def __len__(self):
+        return self.length
+
+    def value(self, field: str, i: int) -> Any:
+        kind = self.kinds[field]
+
+        if kind == "int":
+            return self.data[field][i]
+
+        if kind == "bool":
+            return bool(self.data[field][i])
+
+        if self.nulls[field][i]:
+            return None
+
+        offsets = self.offsets[field]
+        s = str(self.data[field][offsets[i]:offsets[i + 1]], "utf-8")
+        return s if kind == "str" else json.loads(s)
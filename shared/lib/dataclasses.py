@@ -1,14 +1,25 @@
 import sys
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from functools import cached_property, cache
 import json
+from operator import itemgetter
 import os
 import re
-from typing import Optional, Callable
+import sqlite3
+from typing import Optional, Callable, Iterable, Sequence
 
+import numpy as np
+import requests
 from tqdm import tqdm
 
-from .networking import fetch_tokens, get_all_exercises
+from .checkpoint import PageCheckpoint, write_records
+from .columnar import ColumnStore, write_columns
+from .index_cache import exercises_digest, index_key, index_path, load_index, store_index
+from .networking import RateLimiter, fetch_tokens, get_page_with_retries, get_pages, page_count
+from .ngrams import build_ngram_index
+from .postings import PostingIndex, PostingIndexBuilder
+from .snapshot import load_snapshot, source_signature, write_snapshot
 
 
 @dataclass
@@ -19,240 +30,663 @@ class Token:
 
 
 TOKENS_FILE = "tokens.json"
+TOKENS_DB = "tokens.db"
+
+
+def encode_tokens(tokens: list[Token]) -> str:
+    return json.dumps([[t.text, t.lemma, t.pos] for t in tokens], ensure_ascii=False)
+
+
+def decode_tokens(tokens_json: str) -> list[Token]:
+    return [Token(*t) for t in json.loads(tokens_json)]
 
 
 class _TokenManager:
     def __init__(self):
-        if os.path.isfile(TOKENS_FILE):
-            with open(TOKENS_FILE, "r") as fh:
-                tokens_json = json.load(fh)
-        else:
-            tokens_json = {}
-
-        self.tokens: dict[int, dict[int, list[Token]]] = {
-            int(collection_id): {
-                int(sentence_id): list(map(lambda d: Token(**d), tokens))
-                for sentence_id, tokens in sentences.items()
-            }
-            for collection_id, sentences in tokens_json.items()
-        }
+        self.tokens: dict[int, dict[int, list[Token]]] = {}
+        self.unsaved: list[tuple[int, int, str]] = []
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            new_db = not os.path.isfile(TOKENS_DB)
+            self._db = sqlite3.connect(TOKENS_DB)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "collection_id INTEGER NOT NULL, "
+                "sentence_id INTEGER NOT NULL, "
+                "tokens TEXT NOT NULL, "
+                "PRIMARY KEY (collection_id, sentence_id)"
+                ") WITHOUT ROWID"
+            )
 
-        self.unsaved_sentences: int = 0
+            if new_db and os.path.isfile(TOKENS_FILE):
+                self.import_json(TOKENS_FILE)
 
-    def get_tokens(self, e: "Exercise") -> list[Token]:
-        if e.collectionId not in self.tokens:
-            self.tokens[e.collectionId] = {}
+        return self._db
 
-        if e.id not in self.tokens[e.collectionId]:
-            self.tokens[e.collectionId][e.id] = [
-                Token(text=t["text"], lemma=t["lemma"]["text"], pos=t["posTag"]["label"])
-                for t in fetch_tokens(e.tokensUrl)
-            ]
+    def import_json(self, filename: str) -> int:
+        with open(filename, "r") as fh:
+            tokens_json = json.load(fh)
 
-            self.unsaved_sentences += 1
-            if self.unsaved_sentences >= 100:
-                self.write()
+        rows = [
+            (int(collection_id), int(sentence_id), encode_tokens([Token(**d) for d in tokens]))
+            for collection_id, sentences in tokens_json.items()
+            for sentence_id, tokens in sentences.items()
+        ]
+        self.db.executemany("INSERT OR IGNORE INTO tokens VALUES (?, ?, ?)", rows)
+        self.db.commit()
 
-        return self.tokens[e.collectionId][e.id]
+        return len(rows)
 
-    def write(self):
-        tokens_json = {
-            str(collection_id): {
-                str(sentence_id): list(map(asdict, tokens))
-                for sentence_id, tokens in sentences.items()
+    def collection(self, collection_id: int) -> dict[int, list[Token]]:
+        if collection_id not in self.tokens:
+            self.tokens[collection_id] = {
+                sentence_id: decode_tokens(tokens)
+                for sentence_id, tokens in self.db.execute(
+                    "SELECT sentence_id, tokens FROM tokens WHERE collection_id = ?", (collection_id,))
             }
-            for collection_id, sentences in self.tokens.items()
+
+        return self.tokens[collection_id]
+
+    def has_tokens(self, e: "Exercise") -> bool:
+        return e.id in self.collection(e.collectionId)
+
+    def add_tokens(self, e: "Exercise", tokens_json: list[dict]):
+        tokens = [
+            Token(text=t["text"], lemma=t["lemma"]["text"], pos=t["posTag"]["label"])
+            for t in tokens_json
+        ]
+        self.collection(e.collectionId)[e.id] = tokens
+
+        self.unsaved.append((e.collectionId, e.id, encode_tokens(tokens)))
+        if len(self.unsaved) >= 100:
+            self.write()
+
+    def get_tokens(self, e: "Exercise") -> list[Token]:
+        if not self.has_tokens(e):
+            self.add_tokens(e, fetch_tokens(e.tokensUrl))
+
+        return self.collection(e.collectionId)[e.id]
+
+    def prefetch(self, exercises: list["Exercise"], jobs: int = 4, rate: float = 2.0, burst: int = 4) -> int:
+        missing = [e for e in exercises if not self.has_tokens(e)]
+        limiter = RateLimiter(rate, burst)
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        futures = {
+            executor.submit(fetch_tokens, e.tokensUrl, limiter): e
+            for e in missing
         }
 
-        with open(TOKENS_FILE, "w") as fh:
-            json.dump(tokens_json, fh, indent=2, sort_keys=True)
+        fetched = 0
+        try:
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                try:
+                    self.add_tokens(futures[future], future.result())
+                    fetched += 1
+                except (RuntimeError, requests.RequestException) as e:
+                    print(f"Failed fetching tokens for sentence {futures[future].id}: {e}")
+        finally:
+            limiter.close()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.write()
+
+        return fetched
+
+    def write(self):
+        if not self.unsaved:
+            return
+
+        self.db.executemany("INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)", self.unsaved)
+        self.db.commit()
+        self.unsaved = []
+
+        self.compact()
 
-        self.unsaved_sentences = 0
+    def compact(self):
+        page_count = self.db.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = self.db.execute("PRAGMA freelist_count").fetchone()[0]
+
+        if freelist_count > page_count // 4:
+            self.db.execute("VACUUM")
 
 
 TokenManager = _TokenManager()
 
 
-@dataclass
-class Exercise:
-    alternativeAnswers: list
-    audioRecordingUrl: None
-    clozeSentenceId: int
-    collectionId: int
-    commentsCount: int
-    difficulty: None
-    easinessFactor: None
-    explanation: None
-    favorited: None
-    hint: str
-    id: int
-    idiom: None
-    ignored: None
-    lastPlayedDate: str
-    level: int
-    moderated: bool
-    multipleChoiceOptions: list
-    nextReview: None
-    notes: str
-    nsfw: None
-    numIgnored: int
-    numIncorrect: int
-    numPlayed: int
-    pronunciation: str
-    repetitionInterval: None
-    sourceName: str
-    sourceUrl: str
-    tatoebaId: int
-    text: str
-    tokensCount: None
-    translation: str
-    transliteration: None
-    ttsAudioUrl: str
-    copyUrl: str
-    tokensUrl: str
-    url: str
-    clozeSentenceTokensUrl: str
-    clozeSentenceUrl: str
-    _tokens: Optional[list[Token]] = None
+CLOZE_PATTERN = re.compile(r"\{\{([^}]+)}}")
+ASCII_WORD_PATTERN = re.compile(r"[A-Za-z]+")
+# Also matches numeric characters like ² and Ⅻ, which split_letters breaks words at
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
 
-    @cached_property
-    def word(self):
-        m = re.search("\{\{([^}]+)}}", self.text)
 
-        if m is None:
-            raise ValueError
+def cloze_word(text: str) -> str:
+    m = CLOZE_PATTERN.search(text)
 
-        return m.group(1)
+    if m is None:
+        raise ValueError
 
-    @cached_property
+    return m.group(1)
+
+
+def strip_cloze(text: str) -> str:
+    return text.replace("{{", "").replace("}}", "")
+
+
+def split_letters(s: str) -> list[str]:
+    out = []
+    current_word = ""
+
+    for c in s:
+        if c.isalpha():
+            current_word += c
+        elif current_word != "":
+            out.append(current_word)
+            current_word = ""
+
+    if current_word != "":
+        out.append(current_word)
+
+    return out
+
+
+def split_words(sentence: str) -> list[str]:
+    if sentence.isascii():
+        return ASCII_WORD_PATTERN.findall(sentence)
+
+    words = WORD_PATTERN.findall(sentence)
+    if not words or "".join(words).isalpha():
+        return words
+
+    return [w for word in words for w in split_letters(word)]
+
+
+EXERCISE_FIELDS = (
+    "alternativeAnswers",
+    "audioRecordingUrl",
+    "clozeSentenceId",
+    "collectionId",
+    "commentsCount",
+    "difficulty",
+    "easinessFactor",
+    "explanation",
+    "favorited",
+    "hint",
+    "id",
+    "idiom",
+    "ignored",
+    "lastPlayedDate",
+    "level",
+    "moderated",
+    "multipleChoiceOptions",
+    "nextReview",
+    "notes",
+    "nsfw",
+    "numIgnored",
+    "numIncorrect",
+    "numPlayed",
+    "pronunciation",
+    "repetitionInterval",
+    "sourceName",
+    "sourceUrl",
+    "tatoebaId",
+    "text",
+    "tokensCount",
+    "translation",
+    "transliteration",
+    "ttsAudioUrl",
+    "copyUrl",
+    "tokensUrl",
+    "url",
+    "clozeSentenceTokensUrl",
+    "clozeSentenceUrl",
+)
+EXERCISE_FIELD_INDICES = {f: i for i, f in enumerate(EXERCISE_FIELDS)}
+
+# Fields read by the commands get their own slots, the rest are looked up in the raw row on access
+HOT_EXERCISE_FIELDS = ("id", "collectionId", "numPlayed", "text", "pronunciation", "translation", "tokensUrl")
+HOT_EXERCISE_FIELD_GETTER = itemgetter(*(EXERCISE_FIELD_INDICES[f] for f in HOT_EXERCISE_FIELDS))
+
+
+class Exercise:
+    __slots__ = ("_row", *HOT_EXERCISE_FIELDS, "_word", "_sentence", "_words", "_tokens")
+
+    def __init__(self, *row, **fields):
+        if fields:
+            unknown = fields.keys() - EXERCISE_FIELD_INDICES.keys()
+            if unknown:
+                raise TypeError(f"Unexpected exercise fields: {', '.join(sorted(unknown))}")
+            row = tuple(fields.get(f) for f in EXERCISE_FIELDS)
+        elif len(row) != len(EXERCISE_FIELDS):
+            raise TypeError(f"Expected {len(EXERCISE_FIELDS)} exercise fields, got {len(row)}")
+
+        self._row: tuple = row
+        (self.id, self.collectionId, self.numPlayed, self.text, self.pronunciation, self.translation,
+         self.tokensUrl) = HOT_EXERCISE_FIELD_GETTER(row)
+        self._word: Optional[str] = None
+        self._sentence: Optional[str] = None
+        self._words: Optional[list[str]] = None
+        self._tokens: Optional[list[Token]] = None
+
+    def __getattr__(self, name: str):
+        if name not in EXERCISE_FIELD_INDICES:
+            raise AttributeError(name)
+        return self._row[EXERCISE_FIELD_INDICES[name]]
+
+    @property
+    def word(self):
+        if self._word is None:
+            self._word = cloze_word(self.text)
+
+        return self._word
+
+    @property
     def sentence(self):
-        return self.text.replace("{{", "").replace("}}", "")
+        if self._sentence is None:
+            self._sentence = strip_cloze(self.text)
 
-    @cached_property
+        return self._sentence
+
+    @property
     def tokens(self) -> list[Token]:
         if self._tokens is None:
             self._tokens = TokenManager.get_tokens(self)
 
         return self._tokens
 
-    @cached_property
+    @property
     def words(self):
-        out = []
-        current_word = ""
+        if self._words is None:
+            self._words = split_words(self.sentence)
 
-        for c in self.sentence:
-            if c.isalpha():
-                current_word += c
-            elif current_word != "":
-                out.append(current_word)
-                current_word = ""
+        return self._words
 
-        if current_word != "":
-            out.append(current_word)
+    def string(self, word: bool):
+        return self.word if word else self.sentence
+
+    def matches(self, d: dict) -> bool:
+        return all(getattr(self, k) == v for k, v in d.items())
+
+    def record(self) -> dict:
+        return {f: getattr(self, f) for f in EXERCISE_FIELDS}
+
+    def __eq__(self, other):
+        return isinstance(other, Exercise) and self._row == other._row
+
+    def __repr__(self):
+        return f"Exercise(id={self.id!r}, text={self.text!r})"
+
+    def __hash__(self):
+        return hash(self.id)
 
-        return out
+
+class ExerciseView:
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: ColumnStore, i: int):
+        self._store = store
+        self._i = i
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in self._store.kinds:
+            raise AttributeError(name)
+        return self._store.value(name, self._i)
+
+    @property
+    def word(self):
+        return cloze_word(self.text)
+
+    @property
+    def sentence(self):
+        return strip_cloze(self.text)
+
+    @property
+    def tokens(self) -> list[Token]:
+        return TokenManager.get_tokens(self)
+
+    @property
+    def words(self):
+        return split_words(self.sentence)
 
     def string(self, word: bool):
         return self.word if word else self.sentence
 
+    def record(self) -> dict:
+        return {f: self._store.value(f, self._i) for f in EXERCISE_FIELDS}
+
+    def __eq__(self, other):
+        return isinstance(other, ExerciseView) and other._store is self._store and other._i == self._i
+
     def __hash__(self):
         return hash(self.id)
 
 
-def all_exercises(course: str, force_reload: bool = False) -> list[Exercise]:
-    os.makedirs("exercises", exist_ok=True)
+class ColumnarExercises(Sequence):
+    def __init__(self, store: ColumnStore):
+        self.store = store
 
-    course_file = f"exercises/{course}.json"
+    def __len__(self):
+        return len(self.store)
 
-    if force_reload or not os.path.exists(course_file):
-        exercises = [
-            Exercise(**d)
-            for d in get_all_exercises(course)
-        ]
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ExerciseView(self.store, j) for j in range(*i.indices(len(self.store)))]
 
-        with open(course_file, "w") as fh:
-            json.dump(
-                {
-                    "exercises": [
-                        asdict(e)
-                        for e in exercises
-                    ],
-                },
-                fh,
-                indent=2
-            )
+        if i < 0:
+            i += len(self.store)
+        if not 0 <= i < len(self.store):
+            raise IndexError(i)
+
+        return ExerciseView(self.store, i)
 
-    else:
+
+def course_filename(course: str) -> str:
+    return f"exercises/{course}.json"
+
+
+def write_exercises(course: str, exercises: list[Exercise]):
+    write_records(course_filename(course), (e.record() for e in exercises))
+
+
+def download_exercises(course: str, jobs: int = 8, retries: int = 3, restart: bool = False):
+    checkpoint = PageCheckpoint(course)
+
+    res = get_page_with_retries(course, 1, retries)
+    num_pages = page_count(res)
+    checkpoint.start(res, restart=restart)
+    checkpoint.save(1, res)
+
+    missing_pages = [page for page in range(2, num_pages + 1) if not checkpoint.has(page)]
+    if len(missing_pages) < num_pages - 1:
+        print(f"Resuming download, {num_pages - 1 - len(missing_pages)} pages already fetched.")
+
+    get_pages(course, missing_pages, jobs, retries, on_page=checkpoint.save)
+
+    write_records(course_filename(course), checkpoint.records(num_pages))
+    checkpoint.clear()
+
+
+def load_rows(course_file: str) -> list[tuple]:
+    rows = load_snapshot(course_file, EXERCISE_FIELDS)
+
+    if rows is None:
         with open(course_file, "r") as fh:
-            exercises = [
-                Exercise(**d)
+            rows = [
+                tuple(d.get(f) for f in EXERCISE_FIELDS)
                 for d in json.load(fh)["exercises"]
             ]
 
-    return exercises
+        write_snapshot(course_file, EXERCISE_FIELDS, rows)
+
+    return rows
+
+
+def load_columns(course_file: str) -> ColumnarExercises:
+    store = ColumnStore.open(course_file, EXERCISE_FIELDS)
+
+    if store is None:
+        write_columns(course_file, EXERCISE_FIELDS, load_rows(course_file))
+        store = ColumnStore.open(course_file, EXERCISE_FIELDS)
+
+    return ColumnarExercises(store)
+
+
+def all_exercises(course: str, force_reload: bool = False, jobs: int = 8, retries: int = 3,
+                  restart: bool = False, columnar: bool = False) -> Sequence[Exercise]:
+    os.makedirs("exercises", exist_ok=True)
+
+    course_file = course_filename(course)
+
+    if force_reload or not os.path.exists(course_file):
+        download_exercises(course, jobs=jobs, retries=retries, restart=restart)
+
+    if columnar:
+        return load_columns(course_file)
+
+    return [Exercise(*row) for row in load_rows(course_file)]
+
+
+@dataclass
+class ExerciseUpdate:
+    exercises: list[Exercise]
+    added: int
+    updated: int
+    pages_fetched: int
+    total: int
+
+
+def update_exercises(course: str, jobs: int = 8, retries: int = 3) -> ExerciseUpdate:
+    if not os.path.exists(course_filename(course)):
+        exercises = all_exercises(course, force_reload=True, jobs=jobs, retries=retries)
+        return ExerciseUpdate(exercises, len(exercises), 0, 0, len(exercises))
+
+    exercises = all_exercises(course)
+    positions = {e.id: i for i, e in enumerate(exercises)}
+    updated = 0
+    # New exercises grouped by the cached exercise they follow on the server, or None before all of them
+    inserts: dict[Optional[int], list[Exercise]] = {}
+    inserted_ids = set()
+    previous = None
+
+    res = get_page_with_retries(course, 1, retries)
+    num_pages = page_count(res)
+    pages = {1: res}
+    next_page = 2
+
+    while pages:
+        page_unchanged = False
+
+        for page in sorted(pages):
+            page_unchanged = True
+
+            for d in pages[page].exercises:
+                if d["id"] in positions:
+                    i = positions[d["id"]]
+                    if not exercises[i].matches(d):
+                        exercises[i] = Exercise(**d)
+                        updated += 1
+                        page_unchanged = False
+                    previous = d["id"]
+                elif d["id"] not in inserted_ids:
+                    inserts.setdefault(previous, []).append(Exercise(**d))
+                    inserted_ids.add(d["id"])
+                    page_unchanged = False
+
+            if page_unchanged:
+                break
+
+        if page_unchanged or next_page > num_pages:
+            break
+
+        batch = range(next_page, min(next_page + jobs, num_pages + 1))
+        pages = get_pages(course, batch, jobs, retries, progress=False)
+        next_page = batch.stop
+
+    added = len(inserted_ids)
+    if added:
+        merged = inserts.get(None, [])
+        for e in exercises:
+            merged.append(e)
+            merged += inserts.get(e.id, [])
+        exercises = merged
+
+    if added or updated:
+        write_exercises(course, exercises)
+
+    return ExerciseUpdate(exercises, added, updated, next_page - 1, res.total)
+
+
+CollectionKey = tuple[str, bool, bool]
+FOLDABLE_COLLECTIONS = ("CHARACTERS", "WORDS")
+# Building these for a whole corpus can fetch data the subset being studied doesn't need
+REMOTE_COLLECTIONS = ("LEMMAS",)
+ItemExtractor = Callable[[Exercise], Iterable]
+
+
+def lemma_items(e: Exercise) -> list[str]:
+    return [t.lemma for t in e.tokens if t.lemma is not None]
 
 
 @dataclass
 class ExerciseList:
     exercises: list[Exercise]
+    collections: dict[CollectionKey, PostingIndex] = field(default_factory=dict, init=False, repr=False)
+    corpus: Optional["ExerciseList"] = field(default=None, repr=False, compare=False)
+    ordinals: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
 
     def __hash__(self):
         return id(self)
 
-    @cache
-    def characters(self, words: bool, case: bool) -> dict[str, list[Exercise]]:
-        out: dict[str, list[Exercise]] = {}
-        for e in self.exercises:
-            for c in e.string(words):
-                if not case:
-                    c = c.lower()
-                if c not in out:
-                    out[c] = []
-                out[c].append(e)
-        return out
+    def subset(self, selection: Sequence) -> "ExerciseList":
+        selection = np.asarray(selection)
+        selection = np.flatnonzero(selection) if selection.dtype == bool else selection.astype(np.int64)
+
+        if self.corpus is None:
+            return type(self)([self.exercises[i] for i in selection.tolist()], corpus=self, ordinals=selection)
+
+        return type(self)([self.exercises[i] for i in selection.tolist()], corpus=self.corpus,
+                          ordinals=self.ordinals[selection])
 
     @cached_property
-    def lemmas(self) -> dict[str, list[Exercise]]:
-        out: dict[str, list[Exercise]] = {}
+    def mask(self) -> np.ndarray:
+        mask = np.zeros(len(self.corpus.exercises), dtype=bool)
+        mask[self.ordinals] = True
+        return mask
+
+    def shares_index(self, collection_type: str, words: bool, case: bool) -> bool:
+        if self.corpus is None:
+            return False
+        if collection_type not in REMOTE_COLLECTIONS:
+            return True
+
+        return (self.corpus.collection_key(collection_type, words, case) in self.corpus.collections
+                or os.path.isfile(index_path(self.corpus.index_key(collection_type, words, case))))
+
+    def collection_key(self, collection_type: str, words: bool, case: bool) -> CollectionKey:
+        if collection_type == "LEMMAS":
+            return collection_type, False, False
+        if collection_type == "WORDS":
+            return collection_type, False, case
+        return collection_type, words, case
+
+    def get_item_extractors(self, words: bool, case: bool) -> dict[str, ItemExtractor]:
+        return {
+            "LEMMAS": lemma_items,
+            "CHARACTERS": (lambda e: e.string(words)) if case else (lambda e: map(str.lower, e.string(words))),
+            "WORDS": (lambda e: e.words) if case else (lambda e: map(str.lower, e.words)),
+        }
 
-        for e in tqdm(self.exercises):
-            for t in e.tokens:
-                if t.lemma not in out:
-                    out[t.lemma] = []
-                out[t.lemma].append(e)
+    def build_collections(self, keys: Iterable[CollectionKey]) -> dict[CollectionKey, PostingIndex]:
+        keys = [self.collection_key(*k) for k in keys]
+        pending = {
+            k: self.get_item_extractors(k[1], k[2])[k[0]]
+            for k in keys
+            if k not in self.collections
+        }
 
-        TokenManager.write()
+        # Case-insensitive collections are folded from their case-sensitive counterparts when both are wanted
+        folded = {}
+        for k in list(pending):
+            source = (k[0], k[1], True)
+            if k[0] in FOLDABLE_COLLECTIONS and not k[2] and (source in pending or source in self.collections):
+                folded[k] = source
+                del pending[k]
 
-        if None in out:
-            del out[None]
+        if pending:
+            builders = [(extract, PostingIndexBuilder()) for extract in pending.values()]
+            fetches_tokens = any(collection_type == "LEMMAS" for collection_type, _, _ in pending)
 
-        return out
+            for i, e in enumerate(tqdm(self.exercises) if fetches_tokens else self.exercises):
+                for extract, builder in builders:
+                    builder.extend(extract(e), i)
 
-    @cache
-    def words(self, case: bool) -> dict[str, list[Exercise]]:
-        out: dict[str, list[Exercise]] = {}
-        for e in self.exercises:
-            for ww in e.words:
-                if not case:
-                    ww = ww.lower()
-                if ww not in out:
-                    out[ww] = []
-                out[ww].append(e)
-
-        return out
-
-    def get_collection_getters(self, words: bool, case: bool) -> dict[str, Callable[[], dict[str, list[Exercise]]]]:
+            if fetches_tokens:
+                TokenManager.write()
+
+            for k, (_, builder) in zip(pending, builders):
+                self.collections[k] = builder.build(self.exercises)
+
+        for k, source in folded.items():
+            self.collections[k] = self.collections[source].fold(str.lower)
+
+        return {k: self.collections[k] for k in keys}
+
+    def collection(self, collection_type: str, words: bool, case: bool) -> PostingIndex:
+        key = self.collection_key(collection_type, words, case)
+        return self.build_collections([key])[key]
+
+    def characters(self, words: bool, case: bool) -> PostingIndex:
+        return self.collection("CHARACTERS", words, case)
+
+    @property
+    def lemmas(self) -> PostingIndex:
+        return self.collection("LEMMAS", False, False)
+
+    def words(self, case: bool) -> PostingIndex:
+        return self.collection("WORDS", False, case)
+
+    def get_collection_getters(self, words: bool, case: bool) -> dict[str, Callable[[], PostingIndex]]:
         return {
-            "LEMMAS": lambda: self.lemmas,
-            "CHARACTERS": lambda: self.characters(words, case),
-            "WORDS": lambda: self.words(case),
+            collection_type: (lambda _ct: lambda: self.collection(_ct, words, case))(collection_type)
+            for collection_type in self.get_item_extractors(words, case)
         }
 
-    def get_counts(self, collection_type: str, words: bool, case: bool) -> dict[str, list[Exercise]]:
+    @cached_property
+    def digest(self) -> str:
+        return exercises_digest(self.exercises)
+
+    def index_key(self, collection_type: str, words: bool, case: bool) -> str:
+        token_store = source_signature(TOKENS_DB) if collection_type == "LEMMAS" and os.path.isfile(TOKENS_DB) else None
+        return index_key(type(self).__name__, self.digest, *self.collection_key(collection_type, words, case),
+                         token_store)
+
+    @cache
+    def get_counts(self, collection_type: str, words: bool, case: bool) -> PostingIndex:
         collection_type = collection_type.upper()
         collection_getters = self.get_collection_getters(words, case)
         if collection_type not in collection_getters:
             print(f"Invalid collection type (choices: {', '.join(collection_getters.keys())})")
             sys.exit(1)
-        return collection_getters[collection_type]()
+
+        if self.shares_index(collection_type, words, case):
+            return self.corpus.get_counts(collection_type, words, case).restrict(self.mask, self.exercises)
+
+        key = self.index_key(collection_type, words, case)
+        counts = load_index(key, self.exercises)
+        if counts is None:
+            counts = collection_getters[collection_type]()
+            # Building lemmas can fetch new tokens, so key the stored index on the token store as it is now
+            store_index(self.index_key(collection_type, words, case), counts)
+
+        return counts
+
+    @cache
+    def contain_index(self, words: bool, case: bool) -> PostingIndex:
+        if self.corpus is not None:
+            return self.corpus.contain_index(words, case).restrict(self.mask, self.exercises)
+
+        key = self.index_key("NGRAMS", words, case)
+        index = load_index(key, self.exercises)
+        if index is None:
+            index = build_ngram_index(self.exercises, words, case)
+            store_index(key, index)
+
+        return index
+
+    def build_indices(self):
+        keys = [
+            (collection_type, words, case)
+            for words in (False, True)
+            for case in (False, True)
+            for collection_type in self.get_collection_getters(words, case)
+        ]
+
+        self.build_collections([
+            k for k in keys
+            if k[0] in self.get_item_extractors(k[1], k[2]) and not os.path.isfile(index_path(self.index_key(*k)))
+        ])
+
+        for k in keys:
+            self.get_counts(*k)
 
@@ -0,0 +1,146 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+PAGE_PATH = re.compile(r"/api/v1/lp/([^/]+)/c/[^/]+/ccs")
+TOKENS_PATH = re.compile(r"/tokens/(\d+)")
+
+
+def synthetic_exercise(i: int) -> dict:
+    return {
+        "alternativeAnswers": [],
+        "audioRecordingUrl": None,
+        "clozeSentenceId": i,
+        "collectionId": 1,
+        "commentsCount": 0,
+        "difficulty": None,
+        "easinessFactor": None,
+        "explanation": None,
+        "favorited": None,
+        "hint": "",
+        "id": i,
+        "idiom": None,
+        "ignored": None,
+        "lastPlayedDate": None,
+        "level": 1,
+        "moderated": False,
+        "multipleChoiceOptions": [],
+        "nextReview": None,
+        "notes": "",
+        "nsfw": None,
+        "numIgnored": 0,
+        "numIncorrect": 0,
+        "numPlayed": 0,
+        "pronunciation": f"文{i}【ぶん】",
+        "repetitionInterval": None,
+        "sourceName": "",
+        "sourceUrl": "",
+        "tatoebaId": i,
+        "text": f"{{{{文}}}}{i}",
+        "tokensCount": None,
+        "translation": f"Sentence {i}",
+        "transliteration": None,
+        "ttsAudioUrl": "",
+        "copyUrl": "",
+        "tokensUrl": "",
+        "url": "",
+        "clozeSentenceTokensUrl": "",
+        "clozeSentenceUrl": "",
+    }
+
+
+@dataclass
+class FakeClozemaster:
+    exercises: list[dict]
+    per_page: int = 50
+    latency: float = 0.05
+    rate_limit_probability: float = 0.0
+    retry_after: int = 1
+    port: int = 0
+    statuses: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def page(self, page: int) -> dict:
+        return {
+            "collectionClozeSentences": self.exercises[(page - 1) * self.per_page:page * self.per_page],
+            "perPage": self.per_page,
+            "total": len(self.exercises),
+        }
+
+    def tokens(self, i: int) -> dict:
+        e = self.exercises[i]
+        return {
+            "tokens": [
+                {"text": w, "lemma": {"text": w.lower()}, "posTag": {"label": "X"}}
+                for w in e["translation"].split()
+            ],
+        }
+
+    def respond(self, path: str) -> tuple[int, Optional[dict]]:
+        time.sleep(self.latency)
+
+        if random.random() < self.rate_limit_probability:
+            return 429, None
+
+        parsed = urlparse(path)
+
+        if PAGE_PATH.fullmatch(parsed.path):
+            return 200, self.page(int(parse_qs(parsed.query).get("page", ["1"])[0]))
+
+        if (m := TOKENS_PATH.fullmatch(parsed.path)) and int(m.group(1)) < len(self.exercises):
+            return 200, self.tokens(int(m.group(1)))
+
+        return 404, None
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, content = fake.respond(self.path)
+                with fake.lock:
+                    fake.statuses[status] += 1
+
+                body = json.dumps(content).encode() if content is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", str(fake.retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeClozemaster":
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), self.handler())
+        self.server.daemon_threads = True
+
+        for i, e in enumerate(self.exercises):
+            self.exercises[i] = {**e, "tokensUrl": f"{self.url}/tokens/{i}"}
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,51 @@
+import gc
+import hashlib
+import os
+import pickle
+import shutil
+from typing import Any, Optional, Sequence
+
+from .postings import PostingIndex
+
+INDEX_CACHE_DIR = "indices"
+INDEX_CACHE_VERSION = 4
+
+
+def exercises_digest(exercises: Sequence) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for e in exercises:
+        h.update(f"{e.id}\0{e.text}\0{e.pronunciation}\0{e.translation}\0".encode())
+    return h.hexdigest()
+
+
+def index_key(*parts: Any) -> str:
+    return hashlib.blake2b(repr((INDEX_CACHE_VERSION, *parts)).encode(), digest_size=16).hexdigest()
+
+
+def index_path(key: str) -> str:
+    return os.path.join(INDEX_CACHE_DIR, f"{key}.pickle")
+
+
+def clear_index_cache():
+    shutil.rmtree(INDEX_CACHE_DIR, ignore_errors=True)
+
+
+def store_index(key: str, index: PostingIndex):
+    os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+    tmp_path = index_path(key) + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        pickle.dump(index.state(), fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, index_path(key))
+
+
+def load_index(key: str, exercises: Sequence) -> Optional[PostingIndex]:
+    gc.disable()
+    try:
+        with open(index_path(key), "rb") as fh:
+            state = pickle.load(fh)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError):
+        return None
+    finally:
+        gc.enable()
+
+    return PostingIndex(exercises, *state)
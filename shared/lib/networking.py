@@ -1,14 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import math
 import os
+import threading
 import time
+from typing import Callable, Iterable, Optional
 
 from bs4 import BeautifulSoup as bs
 import requests
 from tqdm import tqdm
 
+from .client import HttpClient
+
 USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
 SESSION_ID = os.getenv("SESSION_ID")
+CLOZEMASTER_URL = os.getenv("CLOZEMASTER_URL", "https://www.clozemaster.com")
 
 HEADERS = {
     "Cookie": f"_clozemaster_session={SESSION_ID}",
@@ -17,15 +25,84 @@ HEADERS = {
 }
 
 
-def fetch_tokens(tokens_url: str, backoff: int = 5):
-    res = requests.get(url=tokens_url, headers=HEADERS)
+class RateLimiter:
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                if self.closed:
+                    raise RuntimeError("Rate limiter closed")
+
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+
+            time.sleep(min(wait, 1))
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+
+
+def retry_after(res: requests.Response) -> Optional[float]:
+    value = res.headers.get("Retry-After")
+    if value is None:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_tokens(tokens_url: str, limiter: Optional[RateLimiter] = None, backoff: int = 5, max_backoff: int = 300,
+                 retries: int = 10):
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+
+        res = HttpClient.get(tokens_url, headers=HEADERS)
 
-    if res.status_code == 429:
-        print(f"Rate limited fetching tokens, trying again in {backoff} seconds...")
-        time.sleep(backoff)
-        return fetch_tokens(tokens_url, backoff=backoff * 2)
+        if res.status_code != 429:
+            return res.json()["tokens"]
 
-    return res.json()["tokens"]
+        delay = retry_after(res)
+        if delay is None:
+            delay = backoff * 2 ** attempt
+        delay = min(delay, max_backoff)
+        print(f"Rate limited fetching tokens, trying again in {delay:.0f} seconds...")
+        if limiter is None:
+            time.sleep(delay)
+        else:
+            limiter.pause(delay)
+
+    raise RuntimeError(f"Still rate limited after {retries} retries: {tokens_url}")
 
 
 @dataclass
@@ -46,11 +123,8 @@ def get_page(course: str, page: int) -> PageResponse:
     if SESSION_ID is None:
         raise ValueError("Please export a session key.")
 
-    url = f"https://www.clozemaster.com/api/v1/lp/{course}/c/fluency-fast-track-{COURSE_IDS[course]}/ccs?page={page}"
-    res = requests.get(
-        url=url,
-        headers=HEADERS,
-    )
+    url = f"{CLOZEMASTER_URL}/api/v1/lp/{course}/c/fluency-fast-track-{COURSE_IDS[course]}/ccs?page={page}"
+    res = HttpClient.get(url, headers=HEADERS)
 
     if res.status_code != 200:
         raise RuntimeError(f"Request bounced: {res}")
@@ -62,19 +136,70 @@ def get_page(course: str, page: int) -> PageResponse:
     return PageResponse(content["collectionClozeSentences"], per_page, total)
 
 
-def get_all_exercises(course: str) -> list[dict]:
-    res = get_page(course, 1)
-    exercises = [*res.exercises]
+def get_page_with_retries(course: str, page: int, retries: int, backoff: int = 2) -> PageResponse:
+    for attempt in range(retries + 1):
+        try:
+            return get_page(course, page)
+        except (RuntimeError, requests.RequestException) as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            print(f"Failed fetching page {page} ({e}), trying again in {delay} seconds...")
+            time.sleep(delay)
+
+
+def page_count(res: PageResponse) -> int:
+    return math.ceil(res.total / res.per_page)
+
+
+def get_pages(course: str, pages: Iterable[int], jobs: int, retries: int, progress: bool = True,
+              on_page: Optional[Callable[[int, PageResponse], None]] = None) -> dict[int, PageResponse]:
+    out: dict[int, PageResponse] = {}
+    failed: list[int] = []
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(get_page_with_retries, course, page, retries): page
+            for page in pages
+        }
+
+        for future in tqdm(as_completed(futures), total=len(futures), disable=not progress):
+            page = futures[future]
+            try:
+                res = future.result()
+            except (RuntimeError, requests.RequestException):
+                failed.append(page)
+                continue
+
+            if on_page is None:
+                out[page] = res
+            else:
+                on_page(page, res)
+
+    if failed:
+        raise RuntimeError(f"Failed to fetch pages: {', '.join(map(str, sorted(failed)))}")
+
+    return out
+
+
+def get_all_exercises(course: str, jobs: int = 8, retries: int = 3) -> list[dict]:
+    res = get_page_with_retries(course, 1, retries)
+    pages = get_pages(course, range(2, page_count(res) + 1), jobs, retries)
+    pages[1] = res
+
+    return [
+        exercise
+        for page in sorted(pages)
+        for exercise in pages[page].exercises
+    ]
 
-    for page in tqdm(list(range(2, math.ceil(res.total / res.per_page) + 1))):
-        exercises += get_page(course, page).exercises
 
-    return exercises
+def fetch_wiktionary_page(word: str) -> str:
+    return HttpClient.get(f"https://en.wiktionary.org/wiki/{word}").text
 
 
-def get_wiktionary_section(word: str, language: str):
-    res = requests.get(f"https://en.wiktionary.org/wiki/{word}")
-    soup = bs(res.text, "html.parser")
+def parse_wiktionary_section(html: str, language: str):
+    soup = bs(html, "html.parser")
 
     out = []
 
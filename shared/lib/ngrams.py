@@ -0,0 +1,62 @@
+from typing import Sequence
+
+import numpy as np
+
+from .postings import PostingIndex, PostingIndexBuilder
+
+
+def gram_length(c: str) -> int:
+    return 3 if c.isascii() else 2
+
+
+def ngrams(s: str) -> list[str]:
+    grams = [s[i:i + gram_length(c)] for i, c in enumerate(s) if i + gram_length(c) <= len(s)]
+    return [*s, *grams]
+
+
+def query_grams(q: str) -> list[str]:
+    # A gram starting at each position of the query also starts at the matching position of any text containing it
+    grams = [q[i:i + gram_length(c)] for i, c in enumerate(q) if i + gram_length(c) <= len(q)]
+    return list(dict.fromkeys(grams or q))
+
+
+def contain_fields(e, words: bool) -> tuple[str, str]:
+    try:
+        string = e.string(words)
+    except ValueError:
+        string = ""
+
+    return string, e.translation
+
+
+def build_ngram_index(exercises: Sequence, words: bool, case: bool) -> PostingIndex:
+    out = PostingIndexBuilder()
+
+    for i, e in enumerate(exercises):
+        grams = []
+        for field in contain_fields(e, words):
+            grams += ngrams(field if case else field.lower())
+        out.extend(dict.fromkeys(grams), i)
+
+    return out.build(exercises)
+
+
+def ngram_candidates(index: PostingIndex, q: str) -> tuple[np.ndarray, bool]:
+    # Postings of a query that is itself a gram are exactly the exercises containing it
+    if q in index:
+        return index[q].ordinals, True
+
+    grams = query_grams(q)
+    if not grams:
+        return np.arange(len(index.exercises), dtype=np.uint32), True
+    if not all(g in index for g in grams):
+        return np.zeros(0, dtype=np.uint32), True
+
+    postings = sorted((index[g].ordinals for g in grams), key=len)
+    candidates = postings[0]
+    for ordinals in postings[1:]:
+        if len(candidates) == 0:
+            break
+        candidates = np.intersect1d(candidates, ordinals, assume_unique=True)
+
+    return candidates, False
@@ -0,0 +1,165 @@
+from array import array
+from functools import cached_property
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+class Postings(Sequence):
+    __slots__ = ("ordinals", "exercises")
+
+    def __init__(self, ordinals: np.ndarray, exercises: Sequence):
+        self.ordinals = ordinals
+        self.exercises = exercises
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.exercises[o] for o in self.ordinals[i].tolist()]
+        return self.exercises[int(self.ordinals[i])]
+
+    @property
+    def distinct(self) -> int:
+        return len(np.unique(self.ordinals))
+
+    def __repr__(self):
+        return f"Postings({len(self)} occurrences)"
+
+
+class PostingIndex(Mapping):
+    def __init__(self, exercises: Sequence, positions: dict[Any, int], ordinals: np.ndarray, sequence: np.ndarray,
+                 offsets: np.ndarray, distinct: np.ndarray):
+        self.exercises = exercises
+        self.positions = positions
+        self.ordinals = ordinals
+        # Where each occurrence came in the scan the index was built from, which orders items by first occurrence
+        self.sequence = sequence
+        self.offsets = offsets
+        self.distinct = distinct
+
+    @property
+    def occurrences(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def __getitem__(self, item: Any) -> Postings:
+        i = self.positions[item]
+        return Postings(self.ordinals[self.offsets[i]:self.offsets[i + 1]], self.exercises)
+
+    def __contains__(self, item: Any):
+        return item in self.positions
+
+    def __iter__(self) -> Iterator:
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def count(self, item: Any) -> int:
+        i = self.positions.get(item)
+        return 0 if i is None else int(self.offsets[i + 1] - self.offsets[i])
+
+    def counts(self) -> dict[Any, int]:
+        return dict(zip(self.positions, self.occurrences.tolist()))
+
+    def total(self) -> int:
+        return int(self.offsets[-1])
+
+    @cached_property
+    def first_ordinals(self) -> np.ndarray:
+        return self.ordinals[self.offsets[:-1]]
+
+    def threshold_ordinals(self, threshold: int) -> np.ndarray:
+        # The ordinal of the occurrence at which each item reaches the threshold, or past the end if it never does.
+        # Every item occurs at least once, so lower thresholds are reached at the first occurrence.
+        threshold = max(threshold, 1)
+        reached = self.occurrences >= threshold
+        ordinals = np.full(len(self.positions), len(self.exercises), dtype=np.int64)
+        ordinals[reached] = self.ordinals[self.offsets[:-1][reached] + threshold - 1]
+        return ordinals
+
+    def new_item_counts(self, bin_size: int = 1) -> np.ndarray:
+        return np.bincount(self.first_ordinals // bin_size, minlength=-(-len(self.exercises) // bin_size))
+
+    def fold(self, key: Callable[[Any], Any]) -> "PostingIndex":
+        targets = ItemIds()
+        item_targets = np.fromiter((targets[key(item)] for item in self.positions), dtype=np.uint32,
+                                   count=len(self.positions))
+        item_ids = np.repeat(item_targets, self.occurrences)
+        order = np.lexsort((self.sequence, item_ids))
+
+        return build_postings(self.exercises, targets, item_ids[order], self.ordinals[order], self.sequence[order])
+
+    def restrict(self, mask: np.ndarray, exercises: Sequence) -> "PostingIndex":
+        renumbered = np.cumsum(mask, dtype=np.int64) - 1
+        kept = mask[self.ordinals]
+        item_ids = np.repeat(np.arange(len(self.positions), dtype=np.uint32), self.occurrences)[kept]
+        ordinals = renumbered[self.ordinals[kept]].astype(np.uint32)
+        sequence = self.sequence[kept]
+
+        counts = np.bincount(item_ids, minlength=len(self.positions))
+        present = np.flatnonzero(counts)
+        starts = np.cumsum(counts) - counts
+        items_in_order = present[np.argsort(sequence[starts[present]], kind="stable")]
+
+        ranks = np.zeros(len(self.positions), dtype=np.uint32)
+        ranks[items_in_order] = np.arange(len(items_in_order), dtype=np.uint32)
+        items = list(self.positions)
+
+        return build_postings(exercises, [items[i] for i in items_in_order.tolist()], ranks[item_ids], ordinals,
+                              sequence)
+
+    def state(self) -> tuple:
+        return self.positions, self.ordinals, self.sequence, self.offsets, self.distinct
+
+
+def build_postings(exercises: Sequence, items: Iterable, item_ids: np.ndarray, ordinals: np.ndarray,
+                   sequence: Optional[np.ndarray] = None) -> PostingIndex:
+    positions = {item: i for i, item in enumerate(items)}
+    if sequence is None:
+        sequence = np.arange(len(item_ids), dtype=np.uint32)
+
+    order = np.argsort(item_ids, kind="stable")
+    item_ids = item_ids[order]
+    ordinals = ordinals[order]
+    sequence = sequence[order]
+
+    offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(item_ids, minlength=len(positions)), out=offsets[1:])
+
+    first = np.ones(len(ordinals), dtype=bool)
+    first[1:] = (item_ids[1:] != item_ids[:-1]) | (ordinals[1:] != ordinals[:-1])
+    distinct = np.bincount(item_ids[first], minlength=len(positions))
+
+    return PostingIndex(exercises, positions, ordinals, sequence, offsets, distinct)
+
+
+class ItemIds(dict):
+    def __missing__(self, item: Any) -> int:
+        i = self[item] = len(self)
+        return i
+
+
+class PostingIndexBuilder:
+    def __init__(self):
+        self.ids = ItemIds()
+        self.item_ids = array("I")
+        # Runs of consecutive occurrences from the same exercise, as (ordinal, length) pairs
+        self.run_ordinals = array("I")
+        self.run_lengths = array("I")
+
+    def add(self, item: Any, ordinal: int):
+        self.item_ids.append(self.ids[item])
+        self.run_ordinals.append(ordinal)
+        self.run_lengths.append(1)
+
+    def extend(self, items: Iterable, ordinal: int):
+        start = len(self.item_ids)
+        self.item_ids.extend(map(self.ids.__getitem__, items))
+        self.run_ordinals.append(ordinal)
+        self.run_lengths.append(len(self.item_ids) - start)
+
+    def build(self, exercises: Sequence) -> PostingIndex:
+        ordinals = np.repeat(np.array(self.run_ordinals, dtype=np.uint32), np.array(self.run_lengths, dtype=np.int64))
+        return build_postings(exercises, self.ids, np.array(self.item_ids, dtype=np.uint32), ordinals)
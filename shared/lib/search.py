@@ -0,0 +1,111 @@
+import sqlite3
+from typing import Optional
+
+from .dataclasses import EXERCISE_FIELDS, course_filename, load_rows, cloze_word, strip_cloze
+from .snapshot import source_signature
+
+SEARCH_COLUMNS = ("sentence", "word", "translation")
+
+
+def search_filename(course: str) -> str:
+    return f"exercises/{course}.search.db"
+
+
+def search_fields(text: str, translation: str) -> tuple[str, str, str]:
+    try:
+        word = cloze_word(text)
+    except ValueError:
+        word = ""
+
+    return strip_cloze(text), word, translation
+
+
+def fts_phrase(q: str) -> str:
+    return '"' + q.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    def __init__(self, course: str):
+        self.course_file = course_filename(course)
+        self.db = sqlite3.connect(search_filename(course))
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS docs (ordinal INTEGER PRIMARY KEY, id INTEGER, text TEXT, "
+                        "translation TEXT)")
+        self.db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5("
+            f"{', '.join(SEARCH_COLUMNS)}, {', '.join(c + '_lower' for c in SEARCH_COLUMNS)}, "
+            "tokenize='trigram case_sensitive 1')"
+        )
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def sync(self) -> int:
+        signature = repr(source_signature(self.course_file))
+        stored_signature = self.db.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        if stored_signature is not None and stored_signature[0] == signature:
+            return 0
+
+        id_index = EXERCISE_FIELDS.index("id")
+        text_index = EXERCISE_FIELDS.index("text")
+        translation_index = EXERCISE_FIELDS.index("translation")
+
+        stored = {
+            ordinal: (exercise_id, text, translation)
+            for ordinal, exercise_id, text, translation in self.db.execute("SELECT * FROM docs")
+        }
+        rows = load_rows(self.course_file)
+        updated = 0
+
+        for ordinal, row in enumerate(rows):
+            doc = (row[id_index], row[text_index], row[translation_index])
+            if stored.get(ordinal) == doc:
+                continue
+
+            fields = search_fields(doc[1], doc[2])
+            self.db.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)", (ordinal, *doc))
+            self.db.execute("DELETE FROM search WHERE rowid = ?", (ordinal,))
+            self.db.execute(f"INSERT INTO search (rowid, {', '.join(SEARCH_COLUMNS)}, "
+                            f"{', '.join(c + '_lower' for c in SEARCH_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (ordinal, *fields, *(f.lower() for f in fields)))
+            updated += 1
+
+        self.db.execute("DELETE FROM docs WHERE ordinal >= ?", (len(rows),))
+        self.db.execute("DELETE FROM search WHERE rowid >= ?", (len(rows),))
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature,))
+        self.db.commit()
+
+        return updated
+
+    def where_clause(self, q: str, words: bool, case: bool) -> tuple[str, tuple]:
+        columns = ["word" if words else "sentence", "translation"]
+        if not case:
+            columns = [c + "_lower" for c in columns]
+            q = q.lower()
+
+        if len(q) >= 3:
+            return "search MATCH ?", (f"{{{' '.join(columns)}}}: {fts_phrase(q)}",)
+
+        return " OR ".join(f"instr(search.{c}, ?) > 0" for c in columns), (q,) * len(columns)
+
+    def search(self, q: str, words: bool, case: bool, limit: Optional[int] = None) -> tuple[list[int], int]:
+        where, params = self.where_clause(q, words, case)
+
+        count = self.db.execute(f"SELECT COUNT(*) FROM search WHERE {where}", params).fetchone()[0]
+        ordinals = [
+            ordinal
+            for ordinal, in self.db.execute(f"SELECT rowid FROM search WHERE {where} ORDER BY rowid LIMIT ?",
+                                            (*params, -1 if limit is None else limit))
+        ]
+
+        return ordinals, count
+
+    def search_ids(self, q: str, words: bool, case: bool) -> list[int]:
+        where, params = self.where_clause(q, words, case)
+
+        return [
+            exercise_id
+            for exercise_id, in self.db.execute(
+                f"SELECT docs.id FROM search JOIN docs ON docs.ordinal = search.rowid WHERE {where} "
+                f"ORDER BY search.rowid", params)
+        ]
@@ -0,0 +1,41 @@
+import gc
+import marshal
+import os
+from typing import Optional
+
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_filename(filename: str) -> str:
+    return filename + ".snapshot"
+
+
+def source_signature(filename: str) -> tuple[int, int]:
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_snapshot(filename: str, fields: tuple[str, ...], rows: list[tuple]):
+    path = snapshot_filename(filename)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "wb") as fh:
+        marshal.dump((SNAPSHOT_VERSION, source_signature(filename), fields, rows), fh)
+
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(filename: str, fields: tuple[str, ...]) -> Optional[list[tuple]]:
+    gc.disable()
+    try:
+        with open(snapshot_filename(filename), "rb") as fh:
+            version, signature, snapshot_fields, rows = marshal.loads(fh.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    finally:
+        gc.enable()
+
+    if version != SNAPSHOT_VERSION or signature != source_signature(filename) or snapshot_fields != fields:
+        return None
+
+    return rows
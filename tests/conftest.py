@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from shared.lib.dataclasses import Exercise
+from shared.lib.fake_server import synthetic_exercise
+
+SENTENCE_WORDS = ("日本", "本日", "人々", "水", "がっこう", "カタカナ", "々", "！", "Dog", "dog", "DÓG", "Straße", "a1b", "ab",
+                  "x_y", "１２", "𠮟る", "ー", "・")
+TRANSLATION_WORDS = ("Japan", "today", "people", "water", "school", "dog", "DOG", "street", "AB", "the")
+
+
+def make_exercise(i: int, text: str, pronunciation: str = "", translation: str = "") -> Exercise:
+    return Exercise(**{
+        **synthetic_exercise(i),
+        "text": text,
+        "pronunciation": pronunciation,
+        "translation": translation,
+    })
+
+
+@pytest.fixture
+def exercises() -> list[Exercise]:
+    rng = random.Random(0)
+    out = []
+
+    for i in range(300):
+        words = rng.choices(SENTENCE_WORDS, k=rng.randint(1, 6))
+        cloze = rng.randrange(len(words))
+        # A few sentences have no cloze, which makes their word unreadable
+        if i % 50:
+            words[cloze] = "{{" + words[cloze] + "}}"
+        out.append(make_exercise(i, " ".join(words), translation=" ".join(rng.choices(TRANSLATION_WORDS, k=3))))
+
+    return out
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    # Index caches and token stores are written to the working directory
+    monkeypatch.chdir(tmp_path)
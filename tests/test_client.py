@@ -0,0 +1,26 @@
+import pytest
+import requests
+
+from shared.lib.client import HTTP_TIMEOUT, HttpClient, _HttpClient
+from shared.lib.fake_server import FakeClozemaster, synthetic_exercise
+
+
+@pytest.fixture
+def stalled():
+    fake = FakeClozemaster([synthetic_exercise(0)], latency=2).start()
+    yield fake
+    fake.stop()
+
+
+def test_stalled_request_times_out(stalled):
+    client = _HttpClient(timeout=(1, 0.2))
+
+    # Timeouts are RequestExceptions, which every retry loop already handles
+    with pytest.raises(requests.Timeout):
+        client.get(f"{stalled.url}/tokens/0")
+    assert issubclass(requests.Timeout, requests.RequestException)
+
+
+def test_requests_have_a_timeout_by_default():
+    assert HttpClient.timeout == HTTP_TIMEOUT
+    assert all(t > 0 for t in HTTP_TIMEOUT)
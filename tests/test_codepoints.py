@@ -0,0 +1,48 @@
+from collections import Counter
+
+import numpy as np
+
+from japanese.lib.codepoints import CTYPE_CODES, CTYPE_TABLE_SIZE, CTYPES, CodepointCorpus, ctype_table
+from japanese.lib.ctypes import ctype
+
+
+def test_ctype_table_matches_ctype():
+    table = ctype_table()
+    assert [CTYPES[code] for code in table.tolist()] == [ctype(chr(o)) for o in range(CTYPE_TABLE_SIZE)]
+
+
+def test_types_of_astral_characters():
+    corpus = CodepointCorpus(["𠮟a", "😀"])
+    assert [CTYPES[code] for code in corpus.types.tolist()] == [ctype(c) for c in "𠮟a😀"]
+
+
+def test_corpus_matches_character_scan(exercises):
+    strings = [e.sentence for e in exercises]
+    corpus = CodepointCorpus(strings)
+
+    assert corpus.type_counts() == {ct: Counter(ctype(c) for s in strings for c in s)[ct] for ct in CTYPES}
+
+    for ct in CTYPES:
+        expected: dict[str, list[int]] = {}
+        for i, s in enumerate(strings):
+            for c in s:
+                if ctype(c) is ct:
+                    expected.setdefault(c, []).append(i)
+
+        assert corpus.in_order(ct) == list(expected)
+
+        postings = corpus.postings(ct, exercises)
+        assert list(postings) == list(expected)
+        assert {c: postings[c].ordinals.tolist() for c in postings} == expected
+        assert postings.counts() == {c: len(ordinals) for c, ordinals in expected.items()}
+
+
+def test_selected_groups_characters_by_exercise(exercises):
+    strings = [e.sentence for e in exercises]
+    corpus = CodepointCorpus(strings)
+    ct = ctype("水")
+    mask = corpus.types == CTYPE_CODES[ct]
+
+    expected = [(i, [c for c in s if ctype(c) is ct]) for i, s in enumerate(strings)]
+    assert corpus.selected(mask) == [(i, chars) for i, chars in expected if chars]
+    assert corpus.selected(np.zeros(len(mask), dtype=bool)) == []
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from shared.lib.columnar import ColumnStore, columnar_filename
+from shared.lib.dataclasses import (
+    EXERCISE_FIELDS, Exercise, all_exercises, course_filename, load_columns, load_rows, write_exercises)
+from shared.lib.fake_server import synthetic_exercise
+
+COURSE = "jpn-eng"
+
+
+def varied_exercise(i: int) -> Exercise:
+    return Exercise(**{
+        **synthetic_exercise(i),
+        # Strings with nulls, empty strings and multibyte characters
+        "text": ["{{日本}}語", "{{Straße}} 𠮟る", "{{a}}", "{{犬}}が\n走る"][i % 4],
+        "hint": None if i % 3 else "",
+        "notes": "é" * (i % 5),
+        # Values of mixed types are stored as JSON
+        "alternativeAnswers": [["にほん", {"a": [1, None]}], [], None, "x"][i % 4],
+        "difficulty": [None, 1.5, 2, "hard"][i % 4],
+        "moderated": i % 2 == 0,
+        "numPlayed": i * 7 - 3,
+        "nextReview": None,
+    })
+
+
+@pytest.fixture
+def course() -> list[Exercise]:
+    os.makedirs("exercises")
+    exercises = [varied_exercise(i) for i in range(40)]
+    write_exercises(COURSE, exercises)
+    return exercises
+
+
+def columns_path() -> str:
+    return columnar_filename(course_filename(COURSE))
+
+
+def assert_matches_rows(columns, rows: list[tuple]):
+    assert len(columns) == len(rows)
+    for view, row in zip(columns, rows):
+        assert tuple(getattr(view, f) for f in EXERCISE_FIELDS) == row
+        assert view.record() == Exercise(*row).record()
+
+
+def test_columns_match_rows(course):
+    columns = all_exercises(COURSE, columnar=True)
+    store = columns.store
+
+    assert {"int", "bool", "str", "json"} <= set(store.kinds.values())
+    assert store.kinds["id"] == "int" and store.kinds["moderated"] == "bool"
+    assert store.kinds["hint"] == "str" and store.kinds["difficulty"] == "json"
+    assert_matches_rows(columns, load_rows(course_filename(COURSE)))
+    assert [e.record() for e in all_exercises(COURSE)] == [e.record() for e in course]
+
+    assert [v.id for v in columns[5:9]] == [5, 6, 7, 8]
+    assert columns[-1].id == 39
+    with pytest.raises(IndexError):
+        columns[40]
+
+
+def test_columns_are_reused(course):
+    load_columns(course_filename(COURSE))
+    mtime = os.stat(columns_path()).st_mtime_ns
+
+    assert ColumnStore.open(course_filename(COURSE), EXERCISE_FIELDS) is not None
+    assert_matches_rows(load_columns(course_filename(COURSE)), load_rows(course_filename(COURSE)))
+    assert os.stat(columns_path()).st_mtime_ns == mtime
+
+
+def test_empty_course():
+    os.makedirs("exercises")
+    write_exercises(COURSE, [])
+
+    assert len(all_exercises(COURSE, columnar=True)) == 0
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda b: b[:len(b) // 2],
+    lambda b: b[:20],
+    lambda b: b"",
+    lambda b: b"XXXXXXXX" + b[8:],
+    lambda b: b[:8] + (2 ** 40).to_bytes(8, "little") + b[16:],
+    lambda b: b[:16] + b"}" + b[17:],
+    lambda b: b[:16] + b"[1, 2]" + b" " * 100 + b[122:],
+])
+def test_corrupt_columns_are_rebuilt(course, corrupt):
+    load_columns(course_filename(COURSE))
+    with open(columns_path(), "rb") as fh:
+        contents = fh.read()
+    with open(columns_path(), "wb") as fh:
+        fh.write(corrupt(contents))
+
+    assert ColumnStore.open(course_filename(COURSE), EXERCISE_FIELDS) is None
+    assert_matches_rows(load_columns(course_filename(COURSE)), load_rows(course_filename(COURSE)))
+
+
+def test_columns_older_than_json_are_rebuilt(course):
+    load_columns(course_filename(COURSE))
+    write_exercises(COURSE, course[:10] + [varied_exercise(100)])
+
+    assert ColumnStore.open(course_filename(COURSE), EXERCISE_FIELDS) is None
+    columns = load_columns(course_filename(COURSE))
+    assert [v.id for v in columns] == list(range(10)) + [100]
+    assert_matches_rows(columns, load_rows(course_filename(COURSE)))
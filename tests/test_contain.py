@@ -0,0 +1,81 @@
+import argparse
+import importlib
+import os
+import random
+import sys
+
+import pytest
+
+from shared.lib.dataclasses import ExerciseList, write_exercises
+from shared.lib.ngrams import ngram_candidates
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    # Commands resolve the course from the command line, both when they are declared and when they run
+    monkeypatch.setattr(sys, "argv", ["main.py", "jpn", "contain"])
+    return importlib.import_module("shared.commands.commands")
+
+
+@pytest.fixture
+def clozed(exercises):
+    os.makedirs("exercises")
+    clozed = [e for e in exercises if "{{" in e.text]
+    write_exercises("jpn-eng", clozed)
+    return clozed
+
+
+def queries(exercises) -> list[str]:
+    rng = random.Random(1)
+    out = {"", "zzz", "日本人", "ssss", "g 日", "dog dog", "々々", "{{", "!"}
+
+    for e in rng.sample(exercises, 40):
+        for field in (e.sentence, e.word, e.translation):
+            for length in (1, 2, 3, 5, 8):
+                start = rng.randrange(len(field))
+                q = field[start:start + length]
+                out.update([q, q.upper(), q.lower()])
+
+    return sorted(out)
+
+
+def results(matches: tuple[list, int]) -> tuple[list[tuple[int, int]], int]:
+    matching, count = matches
+    return [(i, e.id) for i, e in matching], count
+
+
+@pytest.mark.parametrize("words", [False, True])
+@pytest.mark.parametrize("case", [False, True])
+def test_backends_match_scan(backends, clozed, words, case):
+    el = ExerciseList(clozed)
+
+    for q in queries(clozed):
+        for limit in (len(clozed), 3):
+            namespace = argparse.Namespace(substring=q, words=words, case=case, limit=limit)
+            expected = results(backends.scan_matches(el, namespace))
+            assert results(backends.ngram_matches(el, namespace)) == expected, q
+            assert results(backends.fts_matches(el, namespace)) == expected, q
+
+
+def test_subset_backends_match_scan(backends, clozed):
+    el = ExerciseList(clozed).subset([i % 3 != 1 for i in range(len(clozed))])
+
+    for q in queries(clozed):
+        namespace = argparse.Namespace(substring=q, words=False, case=False, limit=len(clozed))
+        expected = results(backends.scan_matches(el, namespace))
+        assert results(backends.ngram_matches(el, namespace)) == expected, q
+        assert results(backends.fts_matches(el, namespace)) == expected, q
+
+
+@pytest.mark.parametrize("case", [False, True])
+def test_candidates_contain_every_match(backends, clozed, case):
+    el = ExerciseList(clozed)
+    index = el.contain_index(False, case)
+
+    for q in queries(clozed):
+        candidates, exact = ngram_candidates(index, q if case else q.lower())
+        matching = [i for i, e in enumerate(clozed) if backends.contains(e, q, False, case)]
+        if exact:
+            assert candidates.tolist() == matching, q
+        else:
+            assert set(matching) <= set(candidates.tolist()), q
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from shared.lib.dataclasses import TOKENS_DB, Exercise, ExerciseList, _TokenManager
+from shared.lib.index_cache import INDEX_CACHE_DIR, index_path, load_index, store_index
+
+from conftest import make_exercise
+
+KEYS = [("CHARACTERS", False, False), ("CHARACTERS", False, True), ("CHARACTERS", True, False),
+        ("CHARACTERS", True, True), ("WORDS", False, False), ("WORDS", False, True)]
+
+
+@pytest.fixture
+def clozed(exercises) -> list[Exercise]:
+    return [e for e in exercises if "{{" in e.text]
+
+
+def as_scan(index) -> dict:
+    return {item: index[item].ordinals.tolist() for item in index}
+
+
+def poison(el: ExerciseList, key: tuple[str, bool, bool]) -> dict:
+    # Store a recognisably wrong index under the key, so reading it back shows the cache was hit
+    decoy = ExerciseList([make_exercise(i, "{{decoy}}") for i in range(len(el.exercises))]).get_counts(*key)
+    store_index(el.index_key(*key), decoy)
+    return as_scan(decoy)
+
+
+def test_unchanged_corpus_hits(clozed):
+    built = ExerciseList(clozed).get_counts("WORDS", False, False)
+    key = ExerciseList(clozed).index_key("WORDS", False, False)
+
+    assert os.path.isfile(index_path(key))
+    assert as_scan(load_index(key, clozed)) == as_scan(built)
+
+    decoy = poison(ExerciseList(clozed), ("WORDS", False, False))
+    assert as_scan(ExerciseList(clozed).get_counts("WORDS", False, False)) == decoy
+
+
+@pytest.mark.parametrize("change", [
+    lambda es: es[:-1],
+    lambda es: es[1:] + es[:1],
+    lambda es: [make_exercise(0, es[0].text + "x"), *es[1:]],
+    lambda es: [make_exercise(0, es[0].text, translation="other"), *es[1:]],
+    lambda es: [make_exercise(0, es[0].text, pronunciation="日【ひ】"), *es[1:]],
+    lambda es: [make_exercise(12345, es[0].text), *es[1:]],
+])
+def test_changed_corpus_misses(clozed, change):
+    decoy = poison(ExerciseList(clozed), ("WORDS", False, False))
+    changed = change(clozed)
+    el = ExerciseList(changed)
+
+    assert el.index_key("WORDS", False, False) != ExerciseList(clozed).index_key("WORDS", False, False)
+    assert load_index(el.index_key("WORDS", False, False), changed) is None
+    assert as_scan(el.get_counts("WORDS", False, False)) != decoy
+
+
+def test_collection_keys_miss_each_other(clozed):
+    el = ExerciseList(clozed)
+    keys = {key: el.index_key(*key) for key in KEYS}
+    assert len(set(keys.values())) == len(KEYS)
+    # Words ignore the words flag, so they share an index
+    assert el.index_key("WORDS", True, True) == keys[("WORDS", False, True)]
+
+    decoy = poison(el, ("CHARACTERS", False, False))
+    for key in KEYS[1:]:
+        assert as_scan(ExerciseList(clozed).get_counts(*key)) != decoy
+    assert as_scan(ExerciseList(clozed).get_counts("CHARACTERS", False, False)) == decoy
+
+
+def test_token_store_changes_lemma_keys(clozed):
+    el = ExerciseList(clozed)
+    without_store = el.index_key("LEMMAS", False, False)
+    words = el.index_key("WORDS", False, False)
+
+    tokens = _TokenManager()
+    tokens.add_tokens(clozed[0], [{"text": "x", "lemma": {"text": "x"}, "posTag": {"label": "X"}}])
+    tokens.write()
+    assert os.path.isfile(TOKENS_DB)
+    with_store = el.index_key("LEMMAS", False, False)
+
+    tokens.add_tokens(clozed[1], [{"text": "y", "lemma": {"text": "y"}, "posTag": {"label": "X"}}])
+    tokens.write()
+    stat = os.stat(TOKENS_DB)
+    os.utime(TOKENS_DB, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    updated = el.index_key("LEMMAS", False, False)
+
+    assert len({without_store, with_store, updated}) == 3
+    assert el.index_key("WORDS", False, False) == words
+
+
+def test_corrupt_index_misses(clozed):
+    key = ExerciseList(clozed).index_key("WORDS", False, False)
+    os.makedirs(INDEX_CACHE_DIR)
+    with open(index_path(key), "wb") as fh:
+        fh.write(b"not a pickle")
+
+    assert load_index(key, clozed) is None
+    assert as_scan(ExerciseList(clozed).get_counts("WORDS", False, False)) == as_scan(load_index(key, clozed))
@@ -0,0 +1,180 @@
+import itertools
+import random
+import re
+from typing import Callable
+
+import pytest
+
+from japanese.lib.kana import (
+    HIRAGANA_TRANSCRIPTIONS, LONG_VOWELS, PHONEMIC_HIRAGANA_TRANSCRIPTIONS, ROMAJI_MORAS_TO_HIRAGANA,
+    match_conforming, phonemic_transcribe_hiragana, romaji_to_hiragana, transcribe_many)
+
+HIRAGANA = [*PHONEMIC_HIRAGANA_TRANSCRIPTIONS, 'ー', 'a']
+SYLLABLES = [k for k in ROMAJI_MORAS_TO_HIRAGANA if k.isalpha() and k.islower()]
+MACRONS = {short: long for long, short in LONG_VOWELS.items()}
+
+
+# The character-by-character transducers which the tables replaced
+
+def baseline_phonemic_transcribe_hiragana(s: str) -> str:
+    out = ''
+    for c in s:
+        t = PHONEMIC_HIRAGANA_TRANSCRIPTIONS[c]
+        prev = out[-1] if out else None
+        if t[0] == '-':
+            if t[1] == 'y':
+                assert prev == 'i'
+                out = out[:-1] + t[1:]
+            else:
+                raise ValueError(f"Unknown continuation character: {s}")
+        else:
+            if t[0] in 'aiueo' and prev == 'N':
+                out += '\''
+            elif out and prev == 'Q':
+                assert t[0] in 'ksctp'
+                out = out[:-1] + t[0]
+
+            out += t
+
+    return out
+
+
+def baseline_romaji_coda_to_hiragana(c: str) -> str:
+    if c == 'n':
+        return ROMAJI_MORAS_TO_HIRAGANA['N']
+    elif c in 'kstp':
+        return ROMAJI_MORAS_TO_HIRAGANA['Q']
+    else:
+        raise ValueError(f"Malformed coda: {c}")
+
+
+def baseline_romaji_to_hiragana(romaji: str) -> str:
+    match = re.fullmatch("((?:[kgsztdcjnhfpbmyrw]*[aeiouāēīōū])+)([nkstp]?)", romaji)
+    if not match:
+        raise ValueError(f"Malformatted romaji: {romaji}")
+
+    out = ''
+    for syllable in re.findall("[kgsztdcjnhfpbmyrw]*[aeiouāēīōū]", match.group(1)):
+        if syllable[-1] in LONG_VOWELS:
+            short_vowel = LONG_VOWELS[syllable[-1]]
+            out += baseline_romaji_to_hiragana(syllable[:-1] + short_vowel) + ROMAJI_MORAS_TO_HIRAGANA[short_vowel]
+        elif syllable in ROMAJI_MORAS_TO_HIRAGANA:
+            out += ROMAJI_MORAS_TO_HIRAGANA[syllable]
+        elif syllable[1:] in ROMAJI_MORAS_TO_HIRAGANA:
+            out += baseline_romaji_coda_to_hiragana(syllable[0]) + ROMAJI_MORAS_TO_HIRAGANA[syllable[1:]]
+        else:
+            raise ValueError(f"Malformatted syllable: {syllable}")
+    if match.group(2):
+        out += baseline_romaji_coda_to_hiragana(match.group(2))
+
+    return out
+
+
+def baseline_match_conforming(prefix: str, word: str) -> tuple[str, bool]:
+    if len(prefix) > len(word):
+        return prefix, False
+
+    conformed_prefix = ''
+    for pc, wc in zip(prefix, word):
+        if pc == wc:
+            pass
+        elif pc in 'おう' and wc in 'おう' and conformed_prefix and \
+                HIRAGANA_TRANSCRIPTIONS[conformed_prefix[-1]].endswith('o'):
+            pass
+        elif pc in 'ずづ' and wc in 'ずづ':
+            pass
+        elif pc in 'じぢ' and wc in 'じぢ':
+            pass
+        else:
+            return prefix, False
+
+        conformed_prefix += wc
+
+    return conformed_prefix, True
+
+
+def assert_same(baseline: Callable[[str], str], transducer: Callable[[str], str], s: str):
+    # The baseline failed with assertions and lookup errors as well; the tables always raise ValueError
+    try:
+        expected = baseline(s)
+    except (ValueError, AssertionError, KeyError):
+        with pytest.raises(ValueError):
+            transducer(s)
+    else:
+        assert transducer(s) == expected, s
+
+
+def romaji_forms(syllable: str) -> list[str]:
+    long = syllable[:-1] + MACRONS[syllable[-1]] if syllable[-1] in MACRONS else syllable
+    return [syllable, long, *(syllable + coda for coda in "nkstpx"), syllable[0] + syllable, "n" + syllable]
+
+
+def test_phonemic_transcription_matches_baseline():
+    for length in (1, 2, 3):
+        for chars in itertools.product(HIRAGANA, repeat=length):
+            assert_same(baseline_phonemic_transcribe_hiragana, phonemic_transcribe_hiragana, "".join(chars))
+
+    rng = random.Random(0)
+    for _ in range(20000):
+        assert_same(baseline_phonemic_transcribe_hiragana, phonemic_transcribe_hiragana,
+                    "".join(rng.choices(HIRAGANA, k=rng.randint(4, 10))))
+
+
+def transcribable(s: str) -> bool:
+    try:
+        baseline_phonemic_transcribe_hiragana(s)
+    except (ValueError, AssertionError, KeyError):
+        return False
+    return True
+
+
+def test_transcribe_many_matches_single_transcriptions():
+    rng = random.Random(1)
+    strings = ["".join(rng.choices(list(HIRAGANA_TRANSCRIPTIONS), k=rng.randint(1, 5))) for _ in range(3000)]
+    strings = [s for s in strings if transcribable(s)]
+
+    assert len(strings) > 1000
+    assert transcribe_many(strings) == [baseline_phonemic_transcribe_hiragana(s) for s in strings]
+    assert transcribe_many(strings * 2) == transcribe_many(strings) * 2
+    assert transcribe_many([]) == []
+
+
+def test_romaji_syllables_match_baseline():
+    for syllable in SYLLABLES:
+        for romaji in romaji_forms(syllable):
+            assert_same(baseline_romaji_to_hiragana, romaji_to_hiragana, romaji)
+
+    for first, second in itertools.product(SYLLABLES, repeat=2):
+        for romaji in (first + second, *(form + second for form in romaji_forms(first))):
+            assert_same(baseline_romaji_to_hiragana, romaji_to_hiragana, romaji)
+
+
+def test_romaji_strings_match_baseline():
+    rng = random.Random(2)
+    letters = "kgsztdcjnhfpbmyrwaeiouāēīōū'x"
+
+    for romaji in ("", "n", "a", "ā", "kan", "kann", "shimbun", "tōkyō", "kitte", "onna", "chotto", "jūdō", "ni'n"):
+        assert_same(baseline_romaji_to_hiragana, romaji_to_hiragana, romaji)
+
+    for _ in range(30000):
+        assert_same(baseline_romaji_to_hiragana, romaji_to_hiragana,
+                    "".join(rng.choices(letters, k=rng.randint(1, 8))))
+        assert_same(baseline_romaji_to_hiragana, romaji_to_hiragana,
+                    "".join(rng.choice([rng.choice(SYLLABLES), rng.choice(letters)]) for _ in range(rng.randint(1, 5))))
+
+
+def test_match_conforming_matches_baseline():
+    rng = random.Random(3)
+    hiragana = list(HIRAGANA_TRANSCRIPTIONS)
+    conforming = 'おうずづじぢこそ'
+
+    short = ["", *conforming, *(a + b for a in conforming for b in conforming)]
+    for prefix, word in itertools.product(short, repeat=2):
+        assert match_conforming(prefix, word) == baseline_match_conforming(prefix, word), (prefix, word)
+
+    for _ in range(30000):
+        prefix = "".join(rng.choices(conforming + "".join(rng.choices(hiragana, k=3)), k=rng.randint(0, 5)))
+        word = "".join(rng.choices(conforming, k=rng.randint(0, 6)))
+        if rng.random() < 0.3:
+            word = prefix + word
+        assert match_conforming(prefix, word) == baseline_match_conforming(prefix, word), (prefix, word)
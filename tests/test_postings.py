@@ -0,0 +1,104 @@
+from typing import Callable, Iterable
+
+import pytest
+
+from shared.lib.dataclasses import Exercise, ExerciseList
+from shared.lib.postings import PostingIndex
+
+from conftest import make_exercise
+
+EXTRACTORS: dict[tuple[str, bool, bool], Callable[[Exercise], Iterable[str]]] = {
+    ("CHARACTERS", False, True): lambda e: e.sentence,
+    ("CHARACTERS", False, False): lambda e: map(str.lower, e.sentence),
+    ("CHARACTERS", True, True): lambda e: e.word,
+    ("CHARACTERS", True, False): lambda e: map(str.lower, e.word),
+    ("WORDS", False, True): lambda e: e.words,
+    ("WORDS", False, False): lambda e: map(str.lower, e.words),
+}
+
+
+def scan(exercises: list[Exercise], extract: Callable[[Exercise], Iterable[str]]) -> dict[str, list[int]]:
+    out: dict[str, list[int]] = {}
+    for i, e in enumerate(exercises):
+        for item in extract(e):
+            out.setdefault(item, []).append(i)
+    return out
+
+
+def as_scan(index: PostingIndex) -> dict[str, list[int]]:
+    return {item: index[item].ordinals.tolist() for item in index}
+
+
+@pytest.fixture
+def clozed(exercises) -> list[Exercise]:
+    return [e for e in exercises if "{{" in e.text]
+
+
+def test_single_pass_matches_scans(clozed):
+    el = ExerciseList(clozed)
+    collections = el.build_collections(EXTRACTORS)
+
+    for key, extract in EXTRACTORS.items():
+        expected = scan(clozed, extract)
+        index = collections[key]
+
+        assert list(index) == list(expected)
+        assert as_scan(index) == expected
+        assert index.counts() == {item: len(ordinals) for item, ordinals in expected.items()}
+        assert index.total() == sum(map(len, expected.values()))
+        assert [list(index[item]) for item in index] == [[clozed[i] for i in ordinals]
+                                                         for ordinals in expected.values()]
+
+
+@pytest.mark.parametrize("collection_type, words", [("CHARACTERS", False), ("CHARACTERS", True), ("WORDS", False)])
+def test_fold_matches_case_insensitive_build(clozed, collection_type, words):
+    folded = ExerciseList(clozed).build_collections([(collection_type, words, True), (collection_type, words, False)])
+    built = ExerciseList(clozed).collection(collection_type, words, False)
+    index = folded[(collection_type, words, False)]
+
+    assert list(index) == list(built)
+    assert as_scan(index) == as_scan(built)
+    assert index.distinct.tolist() == built.distinct.tolist()
+
+
+@pytest.mark.parametrize("threshold", [-1, 0, 1, 2, 4])
+def test_threshold_ordinals_match_scan(clozed, threshold):
+    index = ExerciseList(clozed).words(False)
+    # Every item occurs at least once, so thresholds below one are reached at the first occurrence
+    nth = max(threshold, 1)
+
+    assert index.threshold_ordinals(threshold).tolist() == [
+        ordinals[nth - 1] if len(ordinals) >= nth else len(clozed)
+        for ordinals in as_scan(index).values()
+    ]
+
+
+def test_distinct_counts_exercises_once():
+    index = ExerciseList([make_exercise(0, "{{a}}ab"), make_exercise(1, "{{b}}")]).characters(False, True)
+
+    assert index.counts() == {"a": 2, "b": 2}
+    assert index.distinct.tolist() == [1, 2]
+    assert index["a"].distinct == 1
+
+
+@pytest.mark.parametrize("key", list(EXTRACTORS))
+def test_restrict_matches_subset_build(clozed, key):
+    corpus = ExerciseList(clozed)
+    for selection in ([i % 3 == 0 for i in range(len(clozed))], list(range(len(clozed)))[7:40], []):
+        subset = corpus.subset(selection)
+        restricted = subset.get_counts(*key)
+        built = ExerciseList(subset.exercises).get_counts(*key)
+
+        assert list(restricted) == list(built)
+        assert as_scan(restricted) == as_scan(built)
+        assert restricted.distinct.tolist() == built.distinct.tolist()
+        assert [list(restricted[item]) for item in restricted] == [list(built[item]) for item in built]
+
+
+def test_nested_subsets_restrict_the_corpus(clozed):
+    outer = ExerciseList(clozed).subset(list(range(len(clozed)))[10:])
+    nested = outer.subset([i % 2 == 0 for i in range(len(outer.exercises))])
+    built = ExerciseList(nested.exercises).get_counts("WORDS", False, False)
+
+    assert nested.exercises == clozed[10::2]
+    assert as_scan(nested.get_counts("WORDS", False, False)) == as_scan(built)
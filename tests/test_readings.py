@@ -0,0 +1,79 @@
+import pickle
+import random
+from typing import Iterable, Optional
+
+from japanese.lib.ctypes import CharacterType, ctype
+from japanese.lib.kanji import Reading, parse_readings, reading
+
+PRONUNCIATION_PARTS = ("日本", "人", "々", "人々", "一", "時々", "【にほん】", "【ひと】", "【ひとびと】", "【】", "【ー】",
+                       "【らーめん】", "は", "カタカナ", "ノ【", "】", " ", "、", "abc", "１", "𠮟", "・")
+
+
+def baseline_readings(pronunciation: str) -> Iterable[tuple[str, Optional[str]]]:
+    # The character-by-character parser which parse_readings replaced
+    i = 0
+
+    def next_char():
+        return pronunciation[i] if i < len(pronunciation) else None
+
+    while i < len(pronunciation):
+        if ctype(next_char()) is not CharacterType.KANJI:
+            i += 1
+            continue
+
+        kanji, kana = '', ''
+        while next_char() is not None and (ctype(next_char()) is CharacterType.KANJI or next_char() == '々'):
+            kanji += next_char()
+            i += 1
+
+        if next_char() != '【':
+            yield kanji, None
+            continue
+        i += 1
+
+        while next_char() != '】':
+            kana += next_char()
+            i += 1
+        i += 1
+
+        yield kanji, kana
+
+
+def pronunciations() -> list[str]:
+    rng = random.Random(0)
+    out = ["", "日本【にほん】", "人々【ひとびと】が", "々【のう】", "日本", "日【ひ】本【ほん】", "本【】", "は【は】日"]
+
+    for _ in range(3000):
+        out.append("".join(rng.choices(PRONUNCIATION_PARTS, k=rng.randint(1, 8))))
+
+    return out
+
+
+def test_parse_readings_matches_baseline():
+    for pronunciation in pronunciations():
+        parsed = [(r.kanji, r.kana) for r in parse_readings(pronunciation)]
+        assert parsed == list(baseline_readings(pronunciation)), pronunciation
+
+
+def test_readings_are_interned():
+    first = parse_readings("日本【にほん】の人々【ひとびと】と日本")
+    second = parse_readings("人々【ひとびと】と日本【にほん】")
+
+    assert first[0] is second[1] is reading("日本", "にほん")
+    assert first[1] is second[0]
+    assert first[2] is reading("日本", None) and first[2] is not first[0]
+
+
+def test_reading_equality_hash_and_pickle():
+    interned = reading("学校", "がっこう")
+    fresh = Reading("学校", "がっこう")
+
+    assert interned is not fresh
+    assert interned == fresh and hash(interned) == hash(fresh)
+    assert interned != Reading("学校", None) and interned != ("学校", "がっこう")
+    assert len({interned, fresh, reading("学校", None)}) == 2
+    assert str(interned) == "学校【がっこう】" and len(reading("人", "ひと")) == len("人　【ひと】")
+
+    # Unpickling goes back through the intern table, so hashes are recomputed in the receiving process
+    assert pickle.loads(pickle.dumps(fresh)) is interned
+    assert pickle.loads(pickle.dumps([interned, interned])) == [interned, interned]
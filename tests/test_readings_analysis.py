@@ -0,0 +1,168 @@
+import importlib
+import itertools
+import random
+import sys
+
+import pytest
+
+from japanese.lib.exercise_list import JapaneseExerciseList
+
+from conftest import make_exercise
+
+KANJI = "日本人学校手紙一杯"
+SYLLABLES = "にほんひとがくこうてかみいちはっぱつき"
+
+READINGS = {
+    "日": {"にち": 3, "ひ": 2, "に": 1},
+    "本": {"ほん": 4, "もと": 1},
+    "人": {"ひと": 5, "じん": 2},
+    "学": {"がく": 3},
+    "校": {"こう": 2},
+    "手": {"て": 4},
+    "紙": {"かみ": 2},
+    "一": {"いち": 6},
+    "杯": {"はい": 2},
+}
+
+
+@pytest.fixture
+def analysis(monkeypatch):
+    # Commands resolve the course from the command line when they are declared
+    monkeypatch.setattr(sys, "argv", ["main.py", "jpn", "reading_analysis"])
+    return importlib.import_module("japanese.commands.readings_analysis")
+
+
+def baseline_is_regular(kanji: str, kana: str, readings: dict[str, dict[str, int]]) -> bool:
+    # The recursive matcher which ReadingSegmenter replaced, trying only the current kanji's readings
+    if kanji == "" or kana == "":
+        return kanji == kana
+
+    for reading in readings.get(kanji[0], {}):
+        if kana.startswith(reading) and baseline_is_regular(kanji[1:], kana[len(reading):], readings):
+            return True
+
+    return False
+
+
+def brute_force_segments(analysis, kanji: str, kana: str, readings) -> list[list[str]]:
+    kanji = analysis.expand_iteration_marks(kanji)
+    options = []
+    for i, logogram in enumerate(kanji):
+        spellings = [s for r in readings.get(logogram, {}) for s in analysis.sokuon_variants(r)]
+        if i:
+            spellings = [v for s in spellings for v in analysis.rendaku_variants(s)]
+        options.append(set(spellings))
+
+    return [list(spellings) for spellings in itertools.product(*options) if "".join(spellings) == kana]
+
+
+def random_readings(rng: random.Random) -> dict[str, dict[str, int]]:
+    return {
+        k: {"".join(rng.choices(SYLLABLES, k=rng.randint(1, 3))): 1 for _ in range(rng.randint(1, 3))}
+        for k in rng.sample(KANJI, 6)
+    }
+
+
+def test_variants(analysis):
+    assert analysis.sokuon_variants("がく") == ["がく", "がっ"]
+    assert analysis.sokuon_variants("つ") == ["つ"]
+    assert analysis.sokuon_variants("ほん") == ["ほん"]
+    assert analysis.rendaku_variants("ひと") == ["ひと", "びと", "ぴと"]
+    assert analysis.rendaku_variants("かみ") == ["かみ", "がみ"]
+    assert analysis.rendaku_variants("いち") == ["いち"]
+    assert analysis.expand_iteration_marks("人々") == "人人"
+    assert analysis.expand_iteration_marks("々") == "々"
+
+
+@pytest.mark.parametrize("kanji, kana, expected", [
+    ("日本", "にほん", ["に", "ほん"]),
+    ("学校", "がっこう", ["がっ", "こう"]),
+    ("人々", "ひとびと", ["ひと", "びと"]),
+    ("一杯", "いっぱい", ["いっ", "ぱい"]),
+    ("手紙", "てがみ", ["て", "がみ"]),
+    ("日本人", "にほんじん", ["に", "ほん", "じん"]),
+    # Each kanji is only spelled with its own readings, and only medial kanji are voiced
+    ("日本", "ほんに", None),
+    ("紙手", "がみて", None),
+    ("日本", "にほ", None),
+    ("猫", "ねこ", None),
+])
+def test_segment_known_readings(analysis, kanji, kana, expected):
+    assert analysis.ReadingSegmenter(READINGS).segment(kanji, kana) == expected
+
+
+def test_segment_matches_brute_force(analysis):
+    rng = random.Random(0)
+
+    for _ in range(300):
+        readings = random_readings(rng)
+        segmenter = analysis.ReadingSegmenter(readings)
+
+        for _ in range(20):
+            kanji = "".join(rng.choices(list(readings) + ["々"], k=rng.randint(1, 4))).lstrip("々") or "".join(readings)
+            spellings = [rng.choice(analysis.rendaku_variants(rng.choice(analysis.sokuon_variants(r))))
+                         for c in analysis.expand_iteration_marks(kanji)
+                         for r in [rng.choice(sorted(readings[c]))]]
+
+            for kana in ("".join(spellings), "".join(spellings)[:-1], "".join(spellings) + "ん"):
+                segments = brute_force_segments(analysis, kanji, kana, readings)
+                segmented = segmenter.segment(kanji, kana)
+                if segments:
+                    assert segmented in segments, (kanji, kana)
+                else:
+                    assert segmented is None, (kanji, kana)
+
+
+def test_segment_matches_baseline_without_variants(analysis):
+    rng = random.Random(1)
+    # Without sokuon endings or voiceable initials, every spelling is a plain reading of its own kanji
+    plain = "にんいうあおえみもの"
+
+    for _ in range(300):
+        readings = {k: {"".join(rng.choices(plain, k=rng.randint(1, 3))): 1 for _ in range(2)} for k in KANJI}
+        segmenter = analysis.ReadingSegmenter(readings)
+
+        for _ in range(20):
+            kanji = "".join(rng.choices(KANJI, k=rng.randint(2, 4)))
+            kana = "".join(rng.choice(list(readings[c])) for c in kanji)
+            for candidate in (kana, kana[1:], kana + "に", "".join(rng.choices(plain, k=len(kana)))):
+                expected = baseline_is_regular(kanji, candidate, readings)
+                assert (segmenter.segment(kanji, candidate) is not None) is expected, (kanji, candidate)
+
+
+def test_segment_ambiguous_readings_quickly(analysis):
+    # Exponentially many ways to split a prefix, none of which finish the reading
+    segmenter = analysis.ReadingSegmenter({"一": {"い": 1, "いい": 1, "いち": 1}})
+
+    assert segmenter.segment("一" * 40, "い" * 60 + "に") is None
+    assert "".join(segmenter.segment("一" * 40, "い" * 60)) == "い" * 60
+
+
+def test_analysis_is_the_same_across_processes(analysis):
+    pronunciations = [
+        "日【ひ】", "日【に】", "本【ほん】", "人【ひと】", "人【じん】", "学【がく】", "校【こう】", "手【て】", "紙【かみ】",
+        "一【いち】", "杯【はい】", "日本【にほん】", "学校【がっこう】", "人々【ひとびと】", "一杯【いっぱい】",
+        "手紙【てがみ】", "日本人【にほんじん】", "大人【おとな】", "日本【ほんに】", "今日【きょう】",
+    ]
+    el = JapaneseExerciseList([make_exercise(i, "{{x}}", p) for i, p in enumerate(pronunciations * 3)])
+
+    serial = analysis.ReadingsAnalysis(el)
+    parallel = analysis.ReadingsAnalysis(el, processes=2)
+
+    assert serial.regular_multi_kanji_readings == parallel.regular_multi_kanji_readings
+    assert serial.irregular_multi_kanji_readings == parallel.irregular_multi_kanji_readings
+    assert serial.one_kanji_readings == parallel.one_kanji_readings
+    assert set(serial.regular_multi_kanji_readings) == {"日本", "学校", "人々", "一杯", "手紙", "日本人"}
+    assert serial.irregular_multi_kanji_readings["日本"] == {"ほんに": 3}
+    assert "がっ" in serial.one_kanji_readings["学"] and "びと" in serial.one_kanji_readings["人"]
+
+
+def test_analysis_skips_empty_readings(analysis):
+    pronunciations = ["本【】", "日本【】", "日【に】", "本【ほん】", "日本【にほん】"]
+    el = JapaneseExerciseList([make_exercise(i, "{{x}}", p) for i, p in enumerate(pronunciations)])
+
+    readings = analysis.ReadingsAnalysis(el)
+
+    assert readings.one_kanji_readings == {"日": {"に": 1}, "本": {"ほん": 1}}
+    assert readings.regular_multi_kanji_readings == {"日本": {"にほん": 1}}
+    assert readings.irregular_multi_kanji_readings == {}
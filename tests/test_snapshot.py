@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from shared.lib.dataclasses import EXERCISE_FIELDS, Exercise, course_filename, load_rows, write_exercises
+from shared.lib.fake_server import synthetic_exercise
+from shared.lib.snapshot import load_snapshot, snapshot_filename, write_snapshot
+
+COURSE_FILE = course_filename("jpn-eng")
+
+
+@pytest.fixture
+def rows() -> list[tuple]:
+    os.makedirs("exercises")
+    write_exercises("jpn-eng", [Exercise(**synthetic_exercise(i)) for i in range(20)])
+    return load_rows(COURSE_FILE)
+
+
+def test_snapshot_is_written_and_used(rows):
+    assert load_snapshot(COURSE_FILE, EXERCISE_FIELDS) == rows
+    assert [row[EXERCISE_FIELDS.index("id")] for row in rows] == list(range(20))
+
+    # A fresh snapshot is trusted over the JSON it was taken from
+    write_snapshot(COURSE_FILE, EXERCISE_FIELDS, rows[:3])
+    assert load_rows(COURSE_FILE) == rows[:3]
+
+
+def test_changed_json_falls_back(rows):
+    write_exercises("jpn-eng", [Exercise(**synthetic_exercise(i)) for i in range(5, 30)])
+
+    assert load_snapshot(COURSE_FILE, EXERCISE_FIELDS) is None
+    reloaded = load_rows(COURSE_FILE)
+    assert [row[EXERCISE_FIELDS.index("id")] for row in reloaded] == list(range(5, 30))
+    assert load_snapshot(COURSE_FILE, EXERCISE_FIELDS) == reloaded
+
+
+def test_touched_json_falls_back(rows):
+    # The same size but a newer modification time
+    stat = os.stat(COURSE_FILE)
+    os.utime(COURSE_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert load_snapshot(COURSE_FILE, EXERCISE_FIELDS) is None
+    assert load_rows(COURSE_FILE) == rows
+
+
+def test_snapshot_with_other_fields_falls_back(rows):
+    assert load_snapshot(COURSE_FILE, EXERCISE_FIELDS[:-1]) is None
+
+
+@pytest.mark.parametrize("contents", [b"", b"garbage", b"\xff" * 100])
+def test_corrupt_snapshot_falls_back(rows, contents):
+    with open(snapshot_filename(COURSE_FILE), "wb") as fh:
+        fh.write(contents)
+
+    assert load_snapshot(COURSE_FILE, EXERCISE_FIELDS) is None
+    assert load_rows(COURSE_FILE) == rows
@@ -0,0 +1,75 @@
+import json
+import os
+
+from shared.lib.dataclasses import TOKENS_DB, TOKENS_FILE, Exercise, Token, _TokenManager
+from shared.lib.fake_server import synthetic_exercise
+
+TOKENS_JSON = {
+    "1": {
+        "5": [{"text": "日本", "lemma": "日本", "pos": "PROPN"}, {"text": "へ", "lemma": "へ", "pos": "ADP"}],
+        "6": [],
+    },
+    "2": {
+        "5": [{"text": "Dogs", "lemma": "dog", "pos": "NOUN"}],
+    },
+}
+
+
+def exercise(collection_id: int, i: int) -> Exercise:
+    return Exercise(**{**synthetic_exercise(i), "collectionId": collection_id})
+
+
+def api_tokens(*words: str) -> list[dict]:
+    return [{"text": w, "lemma": {"text": w.lower()}, "posTag": {"label": "X"}} for w in words]
+
+
+def test_tokens_json_is_imported_once():
+    with open(TOKENS_FILE, "w") as fh:
+        json.dump(TOKENS_JSON, fh)
+
+    manager = _TokenManager()
+
+    assert manager.get_tokens(exercise(1, 5)) == [Token("日本", "日本", "PROPN"), Token("へ", "へ", "ADP")]
+    assert manager.get_tokens(exercise(1, 6)) == []
+    assert manager.get_tokens(exercise(2, 5)) == [Token("Dogs", "dog", "NOUN")]
+    assert not manager.has_tokens(exercise(2, 6)) and not manager.has_tokens(exercise(3, 5))
+    assert os.path.isfile(TOKENS_DB)
+
+    # The database is only seeded when it is created, so later edits to tokens.json are ignored
+    with open(TOKENS_FILE, "w") as fh:
+        json.dump({"3": {"5": []}}, fh)
+    assert not _TokenManager().has_tokens(exercise(3, 5))
+
+
+def test_written_tokens_are_read_back():
+    with open(TOKENS_FILE, "w") as fh:
+        json.dump(TOKENS_JSON, fh)
+
+    manager = _TokenManager()
+    manager.add_tokens(exercise(1, 7), api_tokens("Cats"))
+    manager.add_tokens(exercise(2, 6), api_tokens("a", "B"))
+    manager.add_tokens(exercise(1, 5), api_tokens("Replaced"))
+
+    # Nothing reaches the database until the pending tokens are written
+    assert not _TokenManager().has_tokens(exercise(1, 7))
+    manager.write()
+    assert manager.unsaved == []
+
+    reread = _TokenManager()
+    assert reread.get_tokens(exercise(1, 7)) == [Token("Cats", "cats", "X")]
+    assert reread.get_tokens(exercise(2, 6)) == [Token("a", "a", "X"), Token("B", "b", "X")]
+    assert reread.get_tokens(exercise(1, 5)) == [Token("Replaced", "replaced", "X")]
+    assert reread.get_tokens(exercise(2, 5)) == [Token("Dogs", "dog", "NOUN")]
+    assert set(reread.collection(1)) == {5, 6, 7} and set(reread.collection(2)) == {5, 6}
+
+
+def test_tokens_are_written_in_batches():
+    manager = _TokenManager()
+    for i in range(250):
+        manager.add_tokens(exercise(1, i), api_tokens(f"w{i}"))
+
+    assert len(manager.unsaved) == 50
+    assert len(_TokenManager().collection(1)) == 200
+
+    manager.write()
+    assert _TokenManager().get_tokens(exercise(1, 249)) == [Token("w249", "w249", "X")]
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from shared.lib import networking
+from shared.lib.dataclasses import Exercise, update_exercises, write_exercises
+from shared.lib.fake_server import FakeClozemaster, synthetic_exercise
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    os.makedirs("exercises")
+
+    fake = FakeClozemaster([synthetic_exercise(i) for i in range(100)], per_page=10, latency=0).start()
+    monkeypatch.setattr(networking, "CLOZEMASTER_URL", fake.url)
+    monkeypatch.setattr(networking, "SESSION_ID", "test")
+    write_exercises("jpn-eng", [Exercise(**d) for d in fake.exercises])
+
+    yield fake
+    fake.stop()
+
+
+def test_new_exercise_on_later_page(fake):
+    fake.exercises[5] = {**fake.exercises[5], "numPlayed": 1}
+    fake.exercises.insert(10, {**synthetic_exercise(1000), "tokensUrl": f"{fake.url}/tokens/1000"})
+    fake.exercises.insert(11, {**synthetic_exercise(1001), "tokensUrl": f"{fake.url}/tokens/1001"})
+
+    u = update_exercises("jpn-eng", jobs=2)
+
+    assert (u.added, u.updated) == (2, 1)
+    assert [e.id for e in u.exercises] == [d["id"] for d in fake.exercises]
+    assert u.exercises[5].numPlayed == 1
+
+
+def test_new_exercise_on_first_page(fake):
+    fake.exercises.insert(0, {**synthetic_exercise(1000), "tokensUrl": f"{fake.url}/tokens/1000"})
+
+    u = update_exercises("jpn-eng", jobs=2)
+
+    assert u.added == 1
+    assert [e.id for e in u.exercises] == [d["id"] for d in fake.exercises]